@@ -0,0 +1,25 @@
+"""Gunicorn settings for the production web process.
+
+Registration lookups spend most of their time waiting on the MI SOS
+website, so workers serve requests on greenlets instead of blocking a
+whole process per lookup.
+"""
+
+import os
+
+
+worker_class = 'gevent'
+# Every greenlet using the ORM holds its own Postgres connection, so a dyno
+# may open up to WEB_CONCURRENCY x worker_connections of them. Keep that
+# total, plus release and one-off dynos, under the plan's connection limit
+# (20 on Hobby). Raise it only behind a pooler such as the pgbouncer
+# buildpack (heroku/heroku-buildpack-pgbouncer).
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '8'))
+timeout = 60
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    # Gunicorn patches the standard library, but psycopg2 blocks in C
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
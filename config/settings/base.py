@@ -39,6 +39,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'elections.metrics.MetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -119,6 +120,39 @@ CORS_ORIGIN_ALLOW_ALL = True
 
 GRAPPELLI_ADMIN_TITLE = "Michigan Elections Admin"
 
+###############################################################################
+# Michigan Secretary of State
+
+MI_SOS_TIMEOUT = int(os.getenv('MI_SOS_TIMEOUT', '20'))
+MI_SOS_BREAKER_THRESHOLD = int(os.getenv('MI_SOS_BREAKER_THRESHOLD', '5'))
+MI_SOS_BREAKER_COOLDOWN = int(os.getenv('MI_SOS_BREAKER_COOLDOWN', '30'))
+MI_SOS_MAX_WORKERS = int(os.getenv('MI_SOS_MAX_WORKERS', '8'))
+MI_SOS_REQUESTS_PER_SECOND = int(os.getenv('MI_SOS_REQUESTS_PER_SECOND', '10'))
+MI_SOS_BATCH_LIMIT = 1000
+
+REGISTRATION_CACHE_TIMEOUT = int(os.getenv('REGISTRATION_CACHE_TIMEOUT', '1800'))
+REGISTRATION_NEGATIVE_CACHE_TIMEOUT = int(
+    os.getenv('REGISTRATION_NEGATIVE_CACHE_TIMEOUT', '300')
+)
+
+# Parse primaries with the 'general' handlers or the untested 'primary' ones
+PRIMARY_BALLOT_PARSER = os.getenv('PRIMARY_BALLOT_PARSER', 'general')
+
+###############################################################################
+# Precinct Boundaries
+
+PRECINCT_BOUNDARIES_DIR = os.getenv(
+    'PRECINCT_BOUNDARIES_DIR', os.path.join(PROJECT_ROOT, 'data', 'boundaries')
+)
+
+###############################################################################
+# Metrics
+
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', '1.0'))
+METRICS_FLUSH_INTERVAL = 10
+# Bearer token for scrapers; staff sessions can always read the metrics
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 ###############################################################################
 # Django REST Framework
 
@@ -9,6 +9,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from markdown import markdown
 
+from elections import metrics
+
 
 def index(request):
     with Path('README.md').open() as readme:
@@ -39,6 +41,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('grappelli/', include('grappelli.urls')),
     path('docs/', schema_view.with_ui('swagger')),
+    path('metrics', metrics.export, name='metrics'),
     path('', index),
 ]
 
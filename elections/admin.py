@@ -1,10 +1,20 @@
 # pylint: disable=no-self-use
 
-from django.contrib import admin
+import json
+from datetime import datetime
+
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
 from django.shortcuts import redirect, reverse
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 
-from . import models
+from . import metrics, models
 
 
 class DefaultFiltersMixin(admin.ModelAdmin):
@@ -22,6 +32,35 @@ class DefaultFiltersMixin(admin.ModelAdmin):
         return super().changelist_view(request, *args, **kwargs)
 
 
+class EstimatedCountPaginator(Paginator):
+    """Use the query planner's row estimate for large PostgreSQL querysets."""
+
+    threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().count
+
+        # QuerySet.explain() joins the decoded JSON plan into a repr, so run
+        # EXPLAIN directly and read the row psycopg2 has already decoded
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        try:
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+        except (LookupError, TypeError, ValueError):
+            return super().count
+
+        if estimate < self.threshold:
+            return super().count
+        return estimate
+
+
 @admin.register(models.DistrictCategory)
 class DistrictCategoryAdmin(admin.ModelAdmin):
 
@@ -38,6 +77,7 @@ class DistrictAdmin(admin.ModelAdmin):
     list_filter = ['category']
 
     list_display = ['id', 'category', 'name', 'population', 'modified']
+    list_select_related = ['category']
 
     ordering = ['category', 'name']
 
@@ -82,12 +122,17 @@ class PrecinctAdmin(admin.ModelAdmin):
         'mi_sos_id',
         'modified',
     ]
+    list_select_related = ['county', 'jurisdiction']
+
+    autocomplete_fields = ['districts']
 
 
 @admin.register(models.BallotWebsite)
 class BallotWebsiteAdmin(DefaultFiltersMixin, admin.ModelAdmin):
 
-    search_fields = ['mi_sos_election_id', 'mi_sos_precinct_id', 'mi_sos_html']
+    # Matched as exact integers in get_search_results so that the indexes
+    # apply, while "html:" opts in to a scan of every page
+    search_fields = ['mi_sos_election_id', 'mi_sos_precinct_id']
 
     list_filter = ['mi_sos_election_id', 'source', 'fetched', 'valid', 'parsed']
     default_filters = ['mi_sos_election_id={mi_sos_election_id}', 'fetched__exact=1']
@@ -110,6 +155,9 @@ class BallotWebsiteAdmin(DefaultFiltersMixin, admin.ModelAdmin):
 
     ordering = ['-last_fetch']
 
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     def Link(self, obj):
         return format_html(
             '<a href={url!r}>MI SOS: election={eid} precinct={pid}</a>',
@@ -119,11 +167,65 @@ class BallotWebsiteAdmin(DefaultFiltersMixin, admin.ModelAdmin):
         )
 
     def Ballot(self, obj):
-        if obj.ballot:
-            url = reverse('admin:elections_ballot_change', args=[obj.ballot.id])
-            return format_html(f"<a href={url!r}>{obj.ballot.id}</a>")
+        if obj.ballot_id:
+            url = reverse('admin:elections_ballot_change', args=[obj.ballot_id])
+            return format_html(f"<a href={url!r}>{obj.ballot_id}</a>")
         return None
 
+    def get_queryset(self, request):
+        # Pages are loaded on the change form, where the field is accessed
+        return super().get_queryset(request).defer('mi_sos_html')
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term.startswith('html:'):
+            text = search_term[len('html:') :].strip()
+            return queryset.filter(mi_sos_html__icontains=text), False
+        if not all(term.isdigit() for term in search_term.split()):
+            self.message_user(
+                request,
+                "Search matches election or precinct IDs. "
+                "Prefix the query with 'html:' to search the pages.",
+                messages.WARNING,
+            )
+            return queryset.none(), False
+
+        for term in search_term.split():
+            value = int(term)
+            queryset = queryset.filter(
+                Q(mi_sos_election_id=value) | Q(mi_sos_precinct_id=value)
+            )
+        return queryset, False
+
+    def get_urls(self):
+        view = self.admin_site.admin_view(self.crawler_view)
+        return [
+            path('crawler/', view, name='elections_ballotwebsite_crawler')
+        ] + super().get_urls()
+
+    def crawler_view(self, request):
+        stats = metrics.get_crawler_stats()
+        weights = []
+        if stats:
+            for key in ['started', 'updated']:
+                stats[key] = datetime.fromtimestamp(stats[key], tz=timezone.utc)
+
+            previous = 0
+            for bucket in metrics.REFETCH_WEIGHT_BUCKETS:
+                count = stats['refetch_weights'][str(bucket)]
+                weights.append((bucket, count - previous))
+                previous = count
+
+        context = dict(
+            self.admin_site.each_context(request),
+            title="Crawler progress",
+            opts=self.model._meta,  # pylint: disable=protected-access
+            stats=stats,
+            weights=weights,
+        )
+        return TemplateResponse(
+            request, 'admin/elections/ballotwebsite/crawler.html', context
+        )
+
 
 @admin.register(models.Ballot)
 class BallotAdmin(DefaultFiltersMixin, admin.ModelAdmin):
@@ -132,9 +234,13 @@ class BallotAdmin(DefaultFiltersMixin, admin.ModelAdmin):
     default_filters = ['election__id__exact={election_id}']
 
     list_display = ['id', 'election', 'precinct', 'modified']
+    list_select_related = ['election', 'precinct__county', 'precinct__jurisdiction']
 
     ordering = ['-modified']
 
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
 @admin.register(models.Party)
 class PartyAdmin(admin.ModelAdmin):
@@ -169,6 +275,7 @@ class ProposalAdmin(DefaultFiltersMixin, admin.ModelAdmin):
         'election',
         'reference_url',
     ]
+    list_select_related = ['district', 'election']
 
 
 @admin.register(models.Position)
@@ -189,6 +296,7 @@ class PositionAdmin(DefaultFiltersMixin, admin.ModelAdmin):
         'seats',
         'reference_url',
     ]
+    list_select_related = ['district', 'election']
 
 
 @admin.register(models.Candidate)
@@ -210,6 +318,7 @@ class CandidateAdmin(DefaultFiltersMixin, admin.ModelAdmin):
         'Election',
         'modified',
     ]
+    list_select_related = ['party', 'position__district', 'position__election']
 
     def District(self, obj):
         return obj.position.district
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class ElectionsConfig(AppConfig):
+    name = 'elections'
+
+    def ready(self):
+        from . import signals  # pylint: disable=unused-import,import-outside-toplevel
@@ -0,0 +1,193 @@
+"""Locate precincts by coordinates using local boundary files.
+
+Each GeoJSON file in `PRECINCT_BOUNDARIES_DIR` holds a feature collection of
+precinct polygons with `county`, `jurisdiction`, `ward`, and `number`
+properties matching the precinct's name.
+"""
+
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+import log
+
+from . import versions
+from .models import District, Precinct
+
+
+Key = Tuple[str, str, str, str]
+Ring = List[Tuple[float, float]]
+
+
+class Boundary:
+    """Polygon rings of a single precinct in (longitude, latitude) order."""
+
+    __slots__ = ['key', 'rings', 'box']
+
+    def __init__(self, key: Key, rings: List[Ring]):
+        self.key = key
+        self.rings = rings
+        xs = [x for ring in rings for x, _y in ring]
+        ys = [y for ring in rings for _x, y in ring]
+        self.box = (min(xs), min(ys), max(xs), max(ys))
+
+    def __repr__(self) -> str:
+        return f'<Boundary: {" | ".join(self.key)}>'
+
+    def contains(self, x: float, y: float) -> bool:
+        min_x, min_y, max_x, max_y = self.box
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            return False
+
+        # Even-odd ray casting over every ring also excludes holes and handles
+        # precincts split into several polygons
+        inside = False
+        for ring in self.rings:
+            x1, y1 = ring[-1]
+            for x2, y2 in ring:
+                if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+                x1, y1 = x2, y2
+        return inside
+
+
+class BoundaryIndex:
+    """Uniform grid listing the boundaries whose boxes overlap each cell."""
+
+    def __init__(self, boundaries: Iterable[Tuple[Boundary, int]]):
+        self.entries = list(boundaries)
+        self.cells: Dict[Tuple[int, int], List[Tuple[Boundary, int]]] = {}
+        if not self.entries:
+            return
+
+        boxes = [boundary.box for boundary, _value in self.entries]
+        self.min_x = min(box[0] for box in boxes)
+        self.min_y = min(box[1] for box in boxes)
+        self.max_x = max(box[2] for box in boxes)
+        self.max_y = max(box[3] for box in boxes)
+
+        # About one cell per boundary keeps each cell's list short
+        self.size = max(1, math.ceil(math.sqrt(len(self.entries))))
+        self.width = (self.max_x - self.min_x) / self.size or 1.0
+        self.height = (self.max_y - self.min_y) / self.size or 1.0
+
+        for entry in self.entries:
+            min_x, min_y, max_x, max_y = entry[0].box
+            left, bottom = self._cell(min_x, min_y)
+            right, top = self._cell(max_x, max_y)
+            for column in range(left, right + 1):
+                for row in range(bottom, top + 1):
+                    self.cells.setdefault((column, row), []).append(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        column = int((x - self.min_x) / self.width)
+        row = int((y - self.min_y) / self.height)
+        return min(column, self.size - 1), min(row, self.size - 1)
+
+    def locate(self, latitude: float, longitude: float) -> Optional[int]:
+        x, y = longitude, latitude
+        if not self.entries or not (
+            self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y
+        ):
+            return None
+
+        for boundary, value in self.cells.get(self._cell(x, y), []):
+            if boundary.contains(x, y):
+                return value
+        return None
+
+
+def parse(data: Dict) -> Iterator[Boundary]:
+    for feature in data['features']:
+        properties = feature['properties']
+        key = tuple(
+            str(properties.get(name) or '').strip()
+            for name in ['county', 'jurisdiction', 'ward', 'number']
+        )
+
+        geometry = feature['geometry']
+        if geometry['type'] == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry['type'] == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            log.warn(f'Skipped {geometry["type"]} boundary: {key}')
+            continue
+
+        rings = [
+            [(float(x), float(y)) for x, y, *_z in ring]
+            for polygon in polygons
+            for ring in polygon
+            if ring
+        ]
+        if not rings:
+            log.warn(f'Skipped empty boundary: {key}')
+            continue
+
+        yield Boundary(key, rings)  # type: ignore
+
+
+def load(directory: str) -> Iterator[Boundary]:
+    if not os.path.isdir(directory):
+        log.warn(f'Missing precinct boundaries: {directory}')
+        return
+
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(('.geojson', '.json')):
+            log.info(f'Loading precinct boundaries: {filename}')
+            with open(os.path.join(directory, filename)) as f:
+                yield from parse(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def get_boundaries(directory: str) -> Tuple[Boundary, ...]:
+    """Parse the boundary files once per process."""
+    return tuple(load(directory))
+
+
+# Index of the current precinct data, by boundary directory and data version
+_index: Dict[Tuple[str, str], BoundaryIndex] = {}
+
+
+def get_index() -> BoundaryIndex:
+    """Match boundaries to precinct IDs, again whenever the precincts change."""
+    directory = settings.PRECINCT_BOUNDARIES_DIR
+    key = (directory, versions.get_data_version(District, Precinct))
+    if key not in _index:
+        _index.clear()
+        _index[key] = build_index(get_boundaries(directory))
+    return _index[key]
+
+
+def build_index(boundaries: Iterable[Boundary]) -> BoundaryIndex:
+    precincts: Dict[Key, int] = {
+        key[:-1]: key[-1]
+        for key in Precinct.objects.values_list(
+            'county__name', 'jurisdiction__name', 'ward', 'number', 'id'
+        )
+    }
+
+    entries = []
+    for boundary in boundaries:
+        try:
+            entries.append((boundary, precincts[boundary.key]))
+        except KeyError:
+            log.warn(f'No precinct matches boundary: {boundary}')
+
+    return BoundaryIndex(entries)
+
+
+def clear_cache():
+    get_boundaries.cache_clear()
+    _index.clear()
+
+
+def locate(latitude: float, longitude: float) -> Optional[int]:
+    return get_index().locate(latitude, longitude)
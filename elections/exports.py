@@ -0,0 +1,170 @@
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+from rest_framework import renderers
+
+from .models import Candidate, Election, Position, Precinct, Proposal
+
+
+CHUNK_SIZE = 2000
+
+COLUMNS = [
+    'type',
+    'id',
+    'name',
+    'term',
+    'seats',
+    'description',
+    'reference_url',
+    'category',
+    'district_id',
+    'district',
+    'position_id',
+    'proposal_id',
+    'party',
+    'precinct_id',
+    'county',
+    'jurisdiction',
+    'ward',
+    'number',
+    'mi_sos_id',
+]
+
+
+def get_records(election: Election):
+    """Describe each type of exported row as (type, queryset, column lookups)."""
+    district = {
+        'category': 'district__category__name',
+        'district_id': 'district_id',
+        'district': 'district__name',
+    }
+    return [
+        (
+            'precinct',
+            Precinct.objects.filter(ballot__election=election),
+            {
+                'id': 'id',
+                'county': 'county__name',
+                'jurisdiction': 'jurisdiction__name',
+                'ward': 'ward',
+                'number': 'number',
+                'mi_sos_id': 'mi_sos_id',
+            },
+        ),
+        (
+            'position',
+            Position.objects.filter(election=election),
+            {
+                'id': 'id',
+                'name': 'name',
+                'term': 'term',
+                'seats': 'seats',
+                'description': 'description',
+                'reference_url': 'reference_url',
+                **district,
+            },
+        ),
+        (
+            'candidate',
+            Candidate.objects.filter(position__election=election),
+            {
+                'id': 'id',
+                'position_id': 'position_id',
+                'name': 'name',
+                'party': 'party__name',
+                'description': 'description',
+                'reference_url': 'reference_url',
+            },
+        ),
+        (
+            'proposal',
+            Proposal.objects.filter(election=election),
+            {
+                'id': 'id',
+                'name': 'name',
+                'description': 'description',
+                'reference_url': 'reference_url',
+                **district,
+            },
+        ),
+        (
+            'position_precinct',
+            Position.precincts.through.objects.filter(position__election=election),
+            {'position_id': 'position_id', 'precinct_id': 'precinct_id'},
+        ),
+        (
+            'proposal_precinct',
+            Proposal.precincts.through.objects.filter(proposal__election=election),
+            {'proposal_id': 'proposal_id', 'precinct_id': 'precinct_id'},
+        ),
+    ]
+
+
+def iter_rows(election: Election) -> Iterator[Dict[str, Any]]:
+    """Yield every exported row using server-side cursors."""
+    for kind, queryset, columns in get_records(election):
+        names = list(columns)
+        rows = queryset.order_by('id').values_list(*columns.values())
+        for values in rows.iterator(chunk_size=CHUNK_SIZE):
+            row = dict(zip(names, values))
+            row['type'] = kind
+            yield row
+
+
+def iter_ndjson(election: Election) -> Iterator[str]:
+    lines = (json.dumps(row) + '\n' for row in iter_rows(election))
+    return join_chunks(lines)
+
+
+def iter_csv(election: Election) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    lines = (
+        writer.writerow([row.get(name, '') for name in COLUMNS])
+        for row in iter_rows(election)
+    )
+    yield writer.writerow(COLUMNS)
+    yield from join_chunks(lines)
+
+
+def join_chunks(lines: Iterable[str]) -> Iterator[str]:
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+class Echo:
+    """File-like object returning written values for streaming CSV."""
+
+    def write(self, value: str) -> str:  # pylint: disable=no-self-use
+        return value
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    stream = staticmethod(iter_ndjson)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data) + '\n'
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    stream = staticmethod(iter_csv)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        writer = csv.writer(Echo())
+        if isinstance(data, dict):
+            return writer.writerow(data.keys()) + writer.writerow(data.values())
+        return writer.writerow([data])
@@ -1,4 +1,9 @@
+from abc import ABCMeta, abstractmethod
+
+from django.core.validators import EMPTY_VALUES
+
 from django_filters import rest_framework as filters
+from django_filters.filterset import FilterSetMetaclass
 
 from . import models
 
@@ -19,6 +24,43 @@ class InitialilzedFilterSet(filters.FilterSet):
         super().__init__(data, *args, **kwargs)
 
 
+class AbstractFilterSetMetaclass(ABCMeta, FilterSetMetaclass):
+    """Reject filter sets bound to a model that leave abstract methods."""
+
+    def __new__(mcs, name, bases, attrs):
+        cls = super().__new__(mcs, name, bases, attrs)
+        if cls._meta.model and cls.__abstractmethods__:
+            missing = ', '.join(sorted(cls.__abstractmethods__))
+            raise TypeError(f"{name} must implement {missing}")
+        return cls
+
+
+class PrecinctLinksMixin(filters.FilterSet, metaclass=AbstractFilterSetMetaclass):
+    """Apply the precinct_* lookups in one subquery on the precinct M2M table.
+
+    Ballot items shared by several matching precincts are then not
+    duplicated, and adding lookups narrows the subquery instead of adding
+    another one.
+    """
+
+    def filter_queryset(self, queryset):
+        lookups = {}
+        for name, value in self.form.cleaned_data.items():
+            if not name.startswith('precinct_'):
+                queryset = self.filters[name].filter(queryset, value)
+            elif value not in EMPTY_VALUES:
+                lookups[self.filters[name].field_name] = value
+
+        if lookups:
+            queryset = self.filter_precincts(queryset, lookups)
+        return queryset
+
+    @staticmethod
+    @abstractmethod
+    def filter_precincts(queryset, lookups):
+        """Filter items by a subquery on the precinct table with these lookups."""
+
+
 class VoterFilter(filters.FilterSet):
     first_name = filters.CharFilter(
         field_name='first_name',
@@ -163,12 +205,70 @@ class BallotFilter(InitialilzedFilterSet):
         ]
 
 
-class ProposalFilter(BallotFilter):
+class ProposalFilter(PrecinctLinksMixin, BallotFilter):
+    class Meta:
+        model = models.Proposal
+        fields = BallotFilter.Meta.fields
+
+    @staticmethod
+    def filter_precincts(queryset, lookups):
+        through = queryset.model.precincts.through
+        item = queryset.model._meta.model_name  # pylint: disable=protected-access
+        return queryset.filter(id__in=through.objects.filter(**lookups).values(item))
+
+
+class PositionFilter(ProposalFilter):
+    class Meta:
+        model = models.Position
+        fields = BallotFilter.Meta.fields
+
+
+class CandidateFilter(PrecinctLinksMixin, InitialilzedFilterSet):
+
+    # Election ID lookup
+
+    election_id = filters.NumberFilter(
+        field_name='position__election',
+        label="Election ID",
+        help_text="Integer value identifying a specific election.",
+    )
+
+    # Election value lookup
+
+    active_election = filters.BooleanFilter(
+        field_name='position__election__active',
+        initial=True,
+        help_text="Include only recent and upcoming elections. Defaults to true.",
+    )
+
+    # Ballot item ID lookup
+
+    position_id = filters.NumberFilter(
+        field_name='position',
+        label="Position ID",
+        help_text="Integer value identifying a specific position.",
+    )
+    district_id = filters.NumberFilter(
+        field_name='position__district',
+        label="District ID",
+        help_text="Integer value identifying a specific district.",
+    )
+
+    # Party lookup
+
+    party_id = filters.NumberFilter(
+        field_name='party',
+        label="Party ID",
+        help_text="Integer value identifying a specific party.",
+    )
+    party = filters.CharFilter(
+        field_name='party__name', label="Party", help_text="Name of the party."
+    )
 
     # Precinct ID lookup
 
     precinct_id = filters.NumberFilter(
-        field_name='precincts',
+        field_name='precinct',
         label="Precinct ID",
         help_text="Integer value identifying a specific precinct.",
     )
@@ -176,32 +276,45 @@ class ProposalFilter(BallotFilter):
     # Precinct value lookup
 
     precinct_county = filters.CharFilter(
-        field_name='precincts__county__name',
+        field_name='precinct__county__name',
         label="County",
         help_text="Name of the precinct's county.",
     )
     precinct_jurisdiction = filters.CharFilter(
-        field_name='precincts__jurisdiction__name',
+        field_name='precinct__jurisdiction__name',
         label="Jurisdiction",
         help_text="Name of the precinct's jurisdiction.",
     )
     precinct_ward = filters.CharFilter(
-        field_name='precincts__ward',
+        field_name='precinct__ward',
         label="Ward",
         help_text="Ward containing the precinct.",
     )
     precinct_number = filters.CharFilter(
-        field_name='precincts__number',
+        field_name='precinct__number',
         label="Precinct",
         help_text="Number of the precinct.",
     )
 
     class Meta:
-        model = models.Proposal
-        fields = BallotFilter.Meta.fields
-
+        model = models.Candidate
+        fields = [
+            'election_id',
+            'position_id',
+            'district_id',
+            'party_id',
+            'party',
+            'precinct_id',
+            'precinct_county',
+            'precinct_jurisdiction',
+            'precinct_ward',
+            'precinct_number',
+            'active_election',
+        ]
 
-class PositionFilter(ProposalFilter):
-    class Meta:
-        model = models.Position
-        fields = BallotFilter.Meta.fields
+    @staticmethod
+    def filter_precincts(queryset, lookups):
+        # Use the position's precinct table rather than joining positions
+        through = models.Position.precincts.through
+        positions = through.objects.filter(**lookups).values('position')
+        return queryset.filter(position__in=positions)
@@ -1,16 +1,40 @@
+from __future__ import annotations
+
+import math
+import random
 import re
 import string
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
 
 import log
-import requests
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
 from rest_framework.exceptions import APIException
 
 
+if TYPE_CHECKING:
+    import requests
+
+
 MI_SOS_URL = "https://mvic.sos.state.mi.us"
 
-useragent = UserAgent()
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.120 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:69.0) Gecko/20100101 Firefox/69.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.102 Safari/537.36 Edge/18.18362",
+    "Mozilla/5.0 (Windows NT 6.1; Win64; x64; Trident/7.0; rv:11.0) like Gecko",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0 Safari/605.1.15",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.120 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.14; rv:69.0) Gecko/20100101 Firefox/69.0",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.90 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 13_1_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0.1 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 9; SM-G960U) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.116 Mobile Safari/537.36",
+]
 
 
 class ServiceUnavailable(APIException):
@@ -18,13 +42,79 @@ class ServiceUnavailable(APIException):
     default_code = 'service_unavailable'
     default_detail = f'The Michigan Secretary of State website ({MI_SOS_URL}) is temporarily unavailable, please try again later.'
 
+    def __init__(self, detail=None, code=None, wait: Optional[int] = None):
+        super().__init__(detail, code)
+        self.wait = wait
+
+
+class CircuitBreaker:
+    """Fail fast in every worker after a backend fails repeatedly.
+
+    Once tripped, calls are rejected until the cooldown passes. Then a single
+    caller is let through as a probe: success closes the circuit again and
+    failure restarts the cooldown.
+    """
+
+    def __init__(self, name: str, threshold: int, cooldown: int):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures_key = f'{name}:breaker:failures'
+        self.opened_key = f'{name}:breaker:opened'
+        self.probe_key = f'{name}:breaker:probe'
+        self.probing = False
+
+    def __enter__(self):
+        opened = cache.get(self.opened_key)
+        if opened is None:
+            return self
+
+        remaining = opened + self.cooldown - time.time()
+        if remaining > 0 or not cache.add(self.probe_key, True, timeout=self.cooldown):
+            raise ServiceUnavailable(wait=max(1, math.ceil(remaining)))
+
+        log.info(f"Probing circuit: {self.opened_key}")
+        self.probing = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.record_success()
+        elif issubclass(exc_type, ServiceUnavailable):
+            self.record_failure()
+
+    def record_success(self):
+        if self.probing:
+            log.info(f"Closing circuit: {self.opened_key}")
+            cache.delete_many([self.opened_key, self.probe_key])
+        cache.delete(self.failures_key)
+
+    def record_failure(self):
+        cache.add(self.failures_key, 0, timeout=None)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            failures = 1  # the count was reset by a concurrent success
+
+        if self.probing or failures >= self.threshold:
+            log.error(f"Opening circuit after {failures} failure(s): {self.opened_key}")
+            cache.set(self.opened_key, time.time(), timeout=None)
+        if self.probing:
+            cache.delete(self.probe_key)
+
+
+def get_registration_key(voter) -> str:
+    # Keys must not reveal who was looked up, so hash with the secret key
+    digest = salted_hmac('elections.registration', repr(voter.identity)).hexdigest()
+    return f'registration:{digest}'
+
 
 def fetch_registration_status_data(voter):
-    response = requests.post(
+    response = request_mi_sos(
+        'POST',
         f'{MI_SOS_URL}/Voter/SearchByName',
         headers={
             'Content-Type': "application/x-www-form-urlencoded",
-            'User-Agent': useragent.random,
+            'User-Agent': random.choice(USER_AGENTS),
         },
         data={
             'FirstName': voter.first_name,
@@ -35,7 +125,6 @@ def fetch_registration_status_data(voter):
         },
         verify=False,
     )
-    check_availability(response)
 
     # Handle recently moved voters
     if "you have recently moved" in response.text:
@@ -51,9 +140,10 @@ def fetch_registration_status_data(voter):
             response.text,
         )
         url = MI_SOS_URL + page
-        response = requests.get(url, headers={'User-Agent': useragent.random})
+        response = request_mi_sos(
+            'GET', url, headers={'User-Agent': random.choice(USER_AGENTS)}
+        )
         log.debug(f"Response from MI SOS:\n{response.text}")
-        check_availability(response)
 
     # Parse registration
     registered = None
@@ -66,26 +156,143 @@ def fetch_registration_status_data(voter):
 
     # Parse districts
     districs = {}
-    for match in re.findall(r'>([\w ]+):[\s\S]*?">([\w ]*)<', response.text):
-        category = clean_district_category(match[0])
+    for label, value in iter_labeled_values(response.text):
+        category = clean_district_category(label)
         if category not in {'Phone'}:
-            districs[category] = clean_district_name(match[1])
+            districs[category] = clean_district_name(value)
 
     return {"registered": registered, "districts": districs}
 
 
+def fetch_registration_status_data_concurrently(
+    voters: Iterable,
+) -> Iterator[Tuple[Any, Optional[dict], Optional[BaseException]]]:
+    """Yield (voter, data, error) for each voter as its lookup completes."""
+    with ThreadPoolExecutor(max_workers=settings.MI_SOS_MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(fetch_registration_status_data, voter): voter
+            for voter in voters
+        }
+        try:
+            for future in as_completed(futures):
+                error = future.exception()
+                data = None if error else future.result()
+                yield futures[future], data, error
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def request_mi_sos(method: str, url: str, **kwargs) -> requests.Response:
+    import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+    with CircuitBreaker(
+        'mi_sos',
+        threshold=settings.MI_SOS_BREAKER_THRESHOLD,
+        cooldown=settings.MI_SOS_BREAKER_COOLDOWN,
+    ):
+        wait_for_rate_limit()
+        try:
+            response = requests.request(
+                method, url, timeout=settings.MI_SOS_TIMEOUT, **kwargs
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            log.error(f"MI SOS request failed: {e}")
+            raise ServiceUnavailable() from e
+        check_availability(response)
+    return response
+
+
+def wait_for_rate_limit():
+    """Share a requests-per-second budget for the MI SOS website across processes."""
+    while True:
+        now = time.time()
+        key = f'mi_sos:requests:{int(now)}'
+        cache.add(key, 0, timeout=5)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            continue  # the key expired between creating and incrementing it
+        if count <= settings.MI_SOS_REQUESTS_PER_SECOND:
+            return
+        log.debug(f"Waiting for MI SOS rate limit: {count} requests this second")
+        time.sleep(1 - now % 1)
+
+
 def check_availability(response):
     if response.status_code >= 400:
         log.error(f'MI SOS status code: {response.status_code}')
         raise ServiceUnavailable()
 
-    html = BeautifulSoup(response.text, 'html.parser')
-    div = html.find(id='pollingLocationError')
-    if div:
-        if div['style'] != 'display:none;':
+    attrs = find_element_attrs(response.text, 'pollingLocationError')
+    if attrs is not None:
+        if attrs.get('style') != 'display:none;':
             raise ServiceUnavailable()
 
 
+def iter_labeled_values(html: str) -> Iterator[Tuple[str, str]]:
+    r"""Yield the same pairs as re.findall(r'>([\w ]+):[\s\S]*?">([\w ]*)<', html).
+
+    The lazy pattern backtracks over the rest of the page from every label, so
+    this walks forward through the page once with str.find() instead.
+    """
+    position = 0
+    while True:
+        colon = html.find(':', position)
+        if colon == -1:
+            return
+        start = skip_word_characters(html, colon - 1, position - 1, step=-1)
+        if start in {colon - 1, position - 1} or html[start] != '>':
+            position = colon + 1
+            continue
+
+        quote = html.find('">', colon + 1)
+        while quote != -1:
+            end = skip_word_characters(html, quote + 2, len(html))
+            if html.startswith('<', end):
+                break
+            quote = html.find('">', quote + 1)
+        if quote == -1:
+            return  # no later label can be followed by a value either
+
+        yield html[start + 1 : colon], html[quote + 2 : end]
+        position = end + 1
+
+
+def skip_word_characters(text: str, index: int, stop: int, step: int = 1) -> int:
+    # Moves past characters matching '[\w ]' until reaching stop
+    while index != stop and (text[index].isalnum() or text[index] in '_ '):
+        index += step
+    return index
+
+
+def find_element_attrs(html: str, element_id: str) -> Optional[Dict[str, str]]:
+    """Get the attributes of an element by ID without parsing the whole page."""
+    index = html.find(element_id)
+    while index != -1:
+        start = html.rfind('<', 0, index)
+        end = html.find('>', index)
+        if start != -1 and end != -1:
+            parser = StartTagParser()
+            parser.feed(html[start : end + 1])
+            if parser.attrs.get('id') == element_id:
+                return parser.attrs
+        index = html.find(element_id, index + 1)
+    return None
+
+
+class StartTagParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.attrs: Dict[str, str] = {}
+
+    def error(self, message):
+        pass
+
+    def handle_starttag(self, tag, attrs):
+        self.attrs = {name: value or '' for name, value in attrs}
+
+
 def find_or_abort(pattern: str, text: str):
     match = re.search(pattern, text)
     assert match, f"Unable to match {pattern!r} to {text!r}"
@@ -1 +1,47 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from bs4 import element
+
 from . import general, primary, special
+
+
+PARSERS = {
+    'primary': primary,
+    'general': general,
+    'consolidated': general,
+    'special': special,
+}
+
+
+class Pipeline:
+    """Ordered table handlers for ballots of one type of election."""
+
+    def __init__(self, handlers: Sequence[Callable], route: Optional[Callable] = None):
+        self.handlers = tuple(handlers)
+        self.route = route
+
+    def select(
+        self, table: element.Tag, **kwargs
+    ) -> Tuple[Sequence[Callable], Dict[str, Any]]:
+        """Return the handlers to try on a table and any lookups to pass them."""
+        if self.route is None:
+            return self.handlers, {}
+
+        handler, markers = self.route(table, **kwargs)
+        return ([handler] if handler else []), {'markers': markers}
+
+
+def get_pipeline(kind: str) -> Pipeline:
+    # The primary handlers have no passing fixtures, so primaries use the
+    # general layout unless they are explicitly enabled
+    if kind == 'primary' and settings.PRIMARY_BALLOT_PARSER != 'primary':
+        kind = 'general'
+    return _build_pipeline(PARSERS[kind])
+
+
+@lru_cache()
+def _build_pipeline(parsers) -> Pipeline:
+    return Pipeline(parsers.HANDLERS, getattr(parsers, 'route', None))
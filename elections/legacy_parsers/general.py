@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Callable, Optional, Tuple
 
 import bugsnag
 import log
@@ -17,25 +17,103 @@ from elections.models import (
 )
 
 
-def handle_main_wrapper(table: element.Tag, **_) -> bool:
+class TableMarkers:
+    """Class and marker cells of a ballot table, found in a single walk."""
+
+    def __init__(self, table: element.Tag):
+        self.classes = table.get('class')
+        self.section: Optional[element.Tag] = None
+        self.section_td: Optional[element.Tag] = None
+        self.continuation_td: Optional[element.Tag] = None
+        self.proposal_title: Optional[element.Tag] = None
+
+        for tag in table.descendants:
+            if not isinstance(tag, element.Tag) or 'class' not in tag.attrs:
+                continue
+            classes = tag['class']
+            if 'section' in classes:
+                self.section = self.section or tag
+                if tag.name == 'td':
+                    self.section_td = self.section_td or tag
+            if 'continuation' in classes and tag.name == 'td':
+                self.continuation_td = self.continuation_td or tag
+            if 'proposalTitle' in classes:
+                self.proposal_title = self.proposal_title or tag
+            if (
+                self.section_td
+                and self.continuation_td
+                and self.proposal_title
+                and self.section
+            ):
+                break
+
+
+def route(
+    table: element.Tag, *, party: Optional[Party] = None, **_
+) -> Tuple[Optional[Callable], TableMarkers]:
+    """Pick the first handler that would accept a table without calling each one.
+
+    The checks mirror the guards at the top of each handler, in the order of
+    HANDLERS.
+    """
+    markers = TableMarkers(table)
+    classes = markers.classes
+    section = markers.section
+    section_td = markers.section_td
+
+    if classes == ['mainTable']:
+        # A missing header is an error raised by the handler itself
+        if not section_td or "partisan section" in section_td.text.lower():
+            return handle_main_wrapper, markers
+
+    if classes == ['generalTable']:
+        if section_td and "partisan section" in section_td.text.lower():
+            return handle_general_wrapper, markers
+        continuation_td = markers.continuation_td
+        if continuation_td and "continued" in continuation_td.text.lower():
+            return handle_general_wrapper, markers
+
+    if classes == ['tblOffice'] and not (party and party.name == "Nonpartisan"):
+        if not (section and section.text == "NONPARTISAN SECTION"):
+            return handle_partisan_section, markers
+
+    if not (section and section.text != "NONPARTISAN SECTION"):
+        if not markers.proposal_title:
+            return handle_nonpartisan_section, markers
+
+    if classes is None and section_td:
+        return handle_proposals_header, markers
+
+    if classes == ['proposal']:
+        return handle_proposals, markers
+
+    return None, markers
+
+
+def handle_main_wrapper(
+    table: element.Tag, *, markers: Optional[TableMarkers] = None, **_
+) -> bool:
     if table.get('class') == ['mainTable']:
-        td = table.find('td', class_='section')
+        td = (markers or TableMarkers(table)).section_td
         log.debug(f'Found header: {td.text!r}')
         if "partisan section" in td.text.lower():
             return True
     return False
 
 
-def handle_general_wrapper(table: element.Tag, **_) -> bool:
+def handle_general_wrapper(
+    table: element.Tag, *, markers: Optional[TableMarkers] = None, **_
+) -> bool:
     if table.get('class') == ['generalTable']:
+        markers = markers or TableMarkers(table)
 
-        td = table.find('td', class_='section')
+        td = markers.section_td
         if td:
             log.debug(f'Found header: {td.text!r}')
             if "partisan section" in td.text.lower():
                 return True
 
-        td = table.find('td', class_='continuation')
+        td = markers.continuation_td
         if td:
             log.debug(f'Found header: {td.text!r}')
             if "continued" in td.text.lower():
@@ -50,13 +128,14 @@ def handle_partisan_section(
     election: Election,
     precinct: Precinct,
     party: Optional[Party],
+    markers: Optional[TableMarkers] = None,
     **_,
 ) -> Optional[Position]:
     if party and party.name == "Nonpartisan":
         return None
     if table.get('class') != ['tblOffice']:
         return None
-    td = table.find(class_='section')
+    td = (markers or TableMarkers(table)).section
     if td and td.text == "NONPARTISAN SECTION":
         return None
 
@@ -222,12 +301,18 @@ def handle_partisan_section(
 
 
 def handle_nonpartisan_section(
-    table: element.Tag, *, election: Election, precinct: Precinct, **_
+    table: element.Tag,
+    *,
+    election: Election,
+    precinct: Precinct,
+    markers: Optional[TableMarkers] = None,
+    **_,
 ) -> Optional[Proposal]:
-    td = table.find(class_='section')
+    markers = markers or TableMarkers(table)
+    td = markers.section
     if td and td.text != "NONPARTISAN SECTION":
         return None
-    if table.find(class_='proposalTitle'):
+    if markers.proposal_title:
         return None
 
     # Set party
@@ -358,9 +443,11 @@ def handle_general_header(table: element.Tag, **_) -> bool:
     return False
 
 
-def handle_proposals_header(table: element.Tag, **_) -> bool:
+def handle_proposals_header(
+    table: element.Tag, *, markers: Optional[TableMarkers] = None, **_
+) -> bool:
     if table.get('class') == None:
-        td = table.find('td', class_='section')
+        td = (markers or TableMarkers(table)).section_td
         if td:
             header = td.text.strip()
             log.debug(f'Found header: {header!r}')
@@ -466,3 +553,13 @@ def handle_proposals(
     proposal.save()
 
     return proposal
+
+
+HANDLERS = [
+    handle_main_wrapper,
+    handle_general_wrapper,
+    handle_partisan_section,
+    handle_nonpartisan_section,
+    handle_proposals_header,
+    handle_proposals,
+]
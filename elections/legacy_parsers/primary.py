@@ -367,3 +367,15 @@ def handle_proposals(
     proposal.save()
 
     return proposal
+
+
+HANDLERS = [
+    handle_header,
+    handle_party_section,
+    handle_partisan_positions,
+    handle_general_header,
+    handle_nonpartisan_section,
+    handle_nonpartisan_positions,
+    handle_proposals_header,
+    handle_proposals,
+]
@@ -0,0 +1,2 @@
+# Special elections are laid out like general elections
+from .general import HANDLERS, route  # pylint: disable=unused-import
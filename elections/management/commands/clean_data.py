@@ -1,98 +1,158 @@
-# pylint: disable=no-self-use,too-many-nested-blocks
+# pylint: disable=no-self-use
+
+import itertools
+from typing import Dict, List, Set
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Value, When
 
 import bugsnag
 import log
 
-from elections.models import Ballot, Election, Precinct
+from elections import versions
+from elections.models import Ballot, BallotWebsite, Election, Precinct
 
 
 class Command(BaseCommand):
     help = "Validate ballot websites to select the source of truth"
 
-    def handle(self, verbosity: int, **_kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report the planned changes without saving them.",
+        )
+
+    def handle(self, dry_run: bool, verbosity: int, **_kwargs):
         log.init(reset=True, verbosity=verbosity)
 
         try:
-            self.run()
+            with transaction.atomic():
+                self.run(dry_run=dry_run)
         except Exception as e:
             if not settings.DEBUG:
                 bugsnag.notify(e)
             raise e from None
 
-    def run(self):
+    def run(self, *, dry_run: bool = False):
         election = Election.objects.filter(active=True).get()
 
-        for precinct in Precinct.objects.all():
-            precincts = Precinct.objects.filter(mi_sos_id=precinct.mi_sos_id)
-            if len(precincts) == 2:
-
-                count_0 = 0
-                if precincts[0].ward:
-                    count_0 += 1
-                if precincts[0].number:
-                    count_0 += 1
-
-                count_1 = 0
-                if precincts[1].ward:
-                    count_1 += 1
-                if precincts[1].number:
-                    count_1 += 1
-
-                if count_0 > count_1:
-                    duplicate = precincts[1]
-                else:
-                    duplicate = precincts[0]
-
-                self.stdout.write(f'Deleted duplicate precinct: {duplicate}')
-                duplicate.delete()
-
-        for ballot in Ballot.objects.filter(election=election):
-
-            websites = ballot.websites.order_by('mi_sos_precinct_id')
-            count = len(websites)
-            log.debug(f'Ballot {ballot.id}: {count} website(s)')
-
-            if count == 1:
-                website = websites[0]
-
-                if not website.source:
-                    self.stdout.write(f'Set source: {website}')
-                    website.source = True
-                    website.save()
-
-                if ballot.precinct.mi_sos_id != website.mi_sos_precinct_id:
-                    self.stdout.write(f'Set precinct ID: {ballot.precinct}')
-                    assert website.mi_sos_precinct_id
-                    ballot.precinct.mi_sos_id = website.mi_sos_precinct_id
-                    ballot.precinct.save()
-
-            elif count > 1:
-                newest = max(websites, key=lambda w: w.mi_sos_precinct_id)
-                if newest.table_count:
-                    for website in websites:
-
-                        if website.id == newest.id:
-
-                            if not website.source:
-                                self.stdout.write(f'Set source: {website}')
-                                website.source = True
-                                website.save()
-
-                            if ballot.precinct.mi_sos_id != website.mi_sos_precinct_id:
-                                self.stdout.write(f'Set precinct ID: {ballot.precinct}')
-                                assert website.mi_sos_precinct_id
-                                ballot.precinct.mi_sos_id = website.mi_sos_precinct_id
-                                ballot.precinct.save()
-
-                        elif website.source:
-                            website.source = False
-                            website.save()
-                else:
-                    log.warn(f'Ballot has {count} websites: {ballot}')
-                    for website in websites:
-                        log.info(f'{website.table_count} tables: {website}')
+        duplicates = self.find_duplicate_precincts()
+        for precinct in duplicates:
+            self.stdout.write(f'Deleted duplicate precinct: {precinct}')
+        duplicate_ids = [precinct.id for precinct in duplicates]
+
+        sources: Set[int] = set()
+        stale: Set[int] = set()
+        precinct_ids: Dict[int, int] = {}
+
+        websites = (
+            BallotWebsite.objects.filter(ballot__election=election)
+            .exclude(ballot__precinct__in=duplicate_ids)
+            .order_by('ballot_id', 'mi_sos_precinct_id')
+            .values(
+                'id',
+                'ballot',
+                'ballot__precinct',
+                'ballot__precinct__mi_sos_id',
+                'mi_sos_precinct_id',
+                'table_count',
+                'source',
+            )
+        )
+        for ballot_id, rows in itertools.groupby(websites, lambda row: row['ballot']):
+            rows = list(rows)
+            log.debug(f'Ballot {ballot_id}: {len(rows)} website(s)')
+
+            newest = rows[-1]
+            if len(rows) > 1 and not newest['table_count']:
+                ballot = Ballot.objects.get(id=ballot_id)
+                log.warn(f'Ballot has {len(rows)} websites: {ballot}')
+                for website in BallotWebsite.objects.filter(ballot=ballot).defer(
+                    'mi_sos_html'
+                ):
+                    log.info(f'{website.table_count} tables: {website}')
+                continue
+
+            if not newest['source']:
+                sources.add(newest['id'])
+            stale.update(row['id'] for row in rows[:-1] if row['source'])
+
+            mi_sos_id = newest['mi_sos_precinct_id']
+            if newest['ballot__precinct__mi_sos_id'] != mi_sos_id:
+                assert mi_sos_id
+                precinct_ids[newest['ballot__precinct']] = mi_sos_id
+
+        for ballot in (
+            Ballot.objects.filter(election=election, websites__isnull=True)
+            .exclude(precinct__in=duplicate_ids)
+            .select_related('election', 'precinct__county', 'precinct__jurisdiction')
+        ):
+            log.warn(f'Ballot has no websites: {ballot}')
+
+        for website in BallotWebsite.objects.filter(id__in=sources).only(
+            'mi_sos_election_id', 'mi_sos_precinct_id'
+        ):
+            self.stdout.write(f'Set source: {website}')
+
+        precincts = list(
+            Precinct.objects.filter(id__in=precinct_ids).select_related(
+                'county', 'jurisdiction'
+            )
+        )
+        for precinct in precincts:
+            self.stdout.write(f'Set precinct ID: {precinct}')
+            precinct.mi_sos_id = precinct_ids[precinct.id]
+
+        if dry_run:
+            self.stdout.write(
+                f'Dry run: {len(duplicates)} precinct(s) to delete, '
+                f'{len(sources) + len(stale)} website(s) to update, '
+                f'{len(precincts)} precinct ID(s) to set'
+            )
+            return
+
+        Precinct.objects.filter(id__in=duplicate_ids).delete()
+        BallotWebsite.objects.filter(id__in=sources).update(source=True)
+        BallotWebsite.objects.filter(id__in=stale).update(source=False)
+        Precinct.objects.bulk_update(precincts, ['mi_sos_id'], batch_size=1000)
+
+        # Queryset updates skip the signals that invalidate cached responses
+        versions.bump_data_version(BallotWebsite, Precinct)
+
+    def find_duplicate_precincts(self) -> List[Precinct]:
+        """Pick the less specific precinct of each pair sharing an MI SOS ID."""
+        pairs = (
+            Precinct.objects.values('mi_sos_id')
+            .annotate(count=Count('id'))
+            .filter(count=2)
+            .values('mi_sos_id')
+        )
+        precincts = (
+            Precinct.objects.filter(mi_sos_id__in=pairs)
+            .annotate(
+                specificity=Case(
+                    When(ward='', then=Value(0)),
+                    default=Value(1),
+                    output_field=IntegerField(),
+                )
+                + Case(
+                    When(number='', then=Value(0)),
+                    default=Value(1),
+                    output_field=IntegerField(),
+                )
+            )
+            .select_related('county', 'jurisdiction')
+            .order_by('mi_sos_id', 'id')
+        )
+
+        duplicates = []
+        for _mi_sos_id, group in itertools.groupby(precincts, lambda p: p.mi_sos_id):
+            first, second = group
+            if first.specificity > second.specificity:
+                duplicates.append(second)
             else:
-                log.warn(f'Ballot has no websites: {ballot}')
+                duplicates.append(first)
+        return duplicates
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+import log
+
+from elections import vip
+from elections.models import Election
+
+
+class Command(BaseCommand):
+    help = "Write a VIP 5.1 XML feed for an election"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--election', type=int, help="Election ID (defaults to the active election)"
+        )
+        parser.add_argument(
+            '--output', help="Path to write the feed (defaults to standard output)"
+        )
+
+    def handle(self, verbosity: int, election: int, output: str, **_kwargs):
+        log.init(reset=True, verbosity=verbosity)
+
+        if election:
+            instance = Election.objects.get(id=election)
+        else:
+            instance = Election.objects.filter(active=True).get()
+
+        if output:
+            log.info(f"Writing VIP feed for {instance} to {output}")
+            with open(output, 'w', encoding='utf-8') as stream:
+                self.write(instance, stream)
+        else:
+            self.write(instance, sys.stdout)
+
+    @staticmethod
+    def write(election: Election, stream):
+        for chunk in vip.iter_feed(election):
+            stream.write(chunk)
@@ -11,6 +11,7 @@ from django.utils import timezone
 import bugsnag
 import log
 
+from elections.metrics import CrawlerStats, profile_parsers
 from elections.models import (
     Ballot,
     BallotWebsite,
@@ -38,8 +39,13 @@ class Command(BaseCommand):
             type=int,
             help='Maximum number of fetches to perform before stopping.',
         )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='Report the time and queries spent in each ballot table handler.',
+        )
 
-    def handle(self, start: int, limit: int, verbosity: int, **_kwargs):
+    def handle(self, start: int, limit: int, profile: bool, verbosity: int, **_kwargs):
         log.init(reset=True, verbosity=verbosity)
 
         self.ballot_fetches = 0
@@ -55,6 +61,18 @@ class Command(BaseCommand):
             log.warn("No elections to crawl")
             return
 
+        self.stats = CrawlerStats(election.mi_sos_id)
+
+        if profile:
+            with profile_parsers() as parser_profile:
+                try:
+                    self.crawl(election, start)
+                finally:
+                    self.stdout.write(parser_profile.report())
+        else:
+            self.crawl(election, start)
+
+    def crawl(self, election: Election, start: int):
         self.stdout.write('')
         for mi_sos_precinct_id in itertools.count(start=start):
 
@@ -107,6 +125,7 @@ class Command(BaseCommand):
         if website.stale:
             website.fetch()
             self.ballot_fetches += 1
+            self.stats.record_fetch(website.valid)
             fetched_or_parsed = True
 
             if website.valid:
@@ -116,7 +135,8 @@ class Command(BaseCommand):
                 website.save()
 
                 if website.source:
-                    website.parse()
+                    with self.stats.parsing():
+                        website.parse()
 
         if website.valid:
             self.ballot_misses = 0
@@ -125,12 +145,14 @@ class Command(BaseCommand):
                 precinct = self.ensure_precinct(mi_sos_precinct_id, website)
                 ballot = self.ensure_ballot(election, precinct)
                 website.ballot = ballot
-                website.parse()
+                with self.stats.parsing():
+                    website.parse()
                 fetched_or_parsed = True
 
         else:
             self.ballot_misses += 1
 
+        self.stats.record_visit(mi_sos_precinct_id, bool(website.valid))
         return fetched_or_parsed
 
     def ensure_precinct(
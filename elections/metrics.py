@@ -0,0 +1,406 @@
+import hmac
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.http import HttpResponse, HttpResponseForbidden
+from django.urls import URLResolver, get_resolver
+
+
+# Durations are counted in microseconds so the cache can increment integers
+COUNTERS = [
+    ('requests', "Sampled requests handled", 1),
+    ('queries', "Database queries executed", 1),
+    ('db_seconds', "Time spent waiting on the database", 1e6),
+    ('serializer_seconds', "Time spent serializing, less its queries", 1e6),
+    ('python_seconds', "Time spent outside the database and serializers", 1e6),
+    ('cache_hits', "Responses served from the page cache or by ETag", 1),
+    ('cache_misses', "Responses rendered after a page cache miss", 1),
+    ('response_bytes', "Bytes of non-streaming response bodies", 1),
+]
+
+# Requests that don't resolve to a named route
+OTHER = 'other'
+
+WRITES = {'INSERT', 'UPDATE', 'DELETE'}
+
+CRAWLER_KEY = 'elections:metrics:crawler'
+
+REFETCH_WEIGHT_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0]
+
+
+CRAWLER_METRICS = [
+    ('fetches_total', 'counter', "Ballot pages fetched"),
+    ('valid_pages_total', 'counter', "Fetched ballot pages with precinct details"),
+    ('miss_streak', 'gauge', "Consecutive precincts without a valid page"),
+    ('parses_total', 'counter', "Ballots parsed"),
+    ('parse_seconds_total', 'counter', "Time spent parsing ballots"),
+    ('writes_total', 'counter', "Database writes while parsing ballots"),
+    ('mi_sos_precinct_id', 'gauge', "Last precinct ID visited"),
+    ('updated', 'gauge', "Unix time of the last progress update"),
+]
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and their duration."""
+
+    def __init__(self, writes_only: bool = False):
+        self.writes_only = writes_only
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.writes_only and sql.lstrip()[:6].upper() not in WRITES:
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class CrawlerStats:
+    """Progress of a ballot crawl, shared through the cache for dashboards."""
+
+    def __init__(self, mi_sos_election_id: int):
+        self.mi_sos_election_id = mi_sos_election_id
+        self.mi_sos_precinct_id: Optional[int] = None
+        self.started = self.updated = time.time()
+        self.fetches = 0
+        self.valid_pages = 0
+        self.miss_streak = 0
+        self.longest_miss_streak = 0
+        self.parses = 0
+        self.parse_seconds = 0.0
+        self.writes = 0
+
+    def record_fetch(self, valid: bool):
+        self.fetches += 1
+        if valid:
+            self.valid_pages += 1
+
+    def record_visit(self, mi_sos_precinct_id: int, valid: bool):
+        self.mi_sos_precinct_id = mi_sos_precinct_id
+        self.miss_streak = 0 if valid else self.miss_streak + 1
+        self.longest_miss_streak = max(self.longest_miss_streak, self.miss_streak)
+        self.save()
+
+    @contextmanager
+    def parsing(self):
+        timer = QueryTimer(writes_only=True)
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            yield
+        self.parse_seconds += time.perf_counter() - start
+        self.writes += timer.count
+        self.parses += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = max(self.updated - self.started, 1e-6)
+        return {
+            'mi_sos_election_id': self.mi_sos_election_id,
+            'mi_sos_precinct_id': self.mi_sos_precinct_id,
+            'started': self.started,
+            'updated': self.updated,
+            'fetches': self.fetches,
+            'fetches_per_second': self.fetches / elapsed,
+            'valid_pages': self.valid_pages,
+            'valid_ratio': self.valid_pages / self.fetches if self.fetches else None,
+            'miss_streak': self.miss_streak,
+            'longest_miss_streak': self.longest_miss_streak,
+            'parses': self.parses,
+            'parse_seconds': self.parse_seconds,
+            'parse_seconds_per_ballot': (
+                self.parse_seconds / self.parses if self.parses else None
+            ),
+            'writes': self.writes,
+            'writes_per_ballot': self.writes / self.parses if self.parses else None,
+        }
+
+    def save(self):
+        self.updated = time.time()
+        cache.set(CRAWLER_KEY, self.as_dict(), timeout=None)
+
+
+def get_crawler_stats() -> Optional[Dict[str, Any]]:
+    """Load the latest crawl progress with the refetch weights it produced."""
+    stats = cache.get(CRAWLER_KEY)
+    if stats is None:
+        return None
+
+    from .models import BallotWebsite  # pylint: disable=import-outside-toplevel
+
+    websites = BallotWebsite.objects.filter(
+        mi_sos_election_id=stats['mi_sos_election_id']
+    )
+    counts = websites.aggregate(
+        **{
+            str(bucket): Count('id', filter=Q(refetch_weight__lte=bucket))
+            for bucket in REFETCH_WEIGHT_BUCKETS
+        },
+        total=Count('id'),
+        sum=Sum('refetch_weight'),
+    )
+    stats['refetch_weights'] = counts
+    return stats
+
+
+class HandlerStats:
+    def __init__(self):
+        self.calls = 0
+        self.matches = 0
+        self.seconds = 0.0
+        self.queries = 0
+
+
+class ParserProfile:
+    """Call counts, matches, time, and queries of each ballot table handler."""
+
+    def __init__(self):
+        self.handlers: Dict[str, HandlerStats] = {}
+        self.attempts: Counter = Counter()
+
+    def wrap(self, handler: Callable) -> Callable:
+        name = f'{handler.__module__.rsplit(".", 1)[-1]}.{handler.__qualname__}'
+        stats = self.handlers.setdefault(name, HandlerStats())
+
+        def profiled(*args, **kwargs):
+            timer = QueryTimer()
+            start = time.perf_counter()
+            try:
+                with connection.execute_wrapper(timer):
+                    result = handler(*args, **kwargs)
+            finally:
+                stats.seconds += time.perf_counter() - start
+                stats.queries += timer.count
+                stats.calls += 1
+            if result:
+                stats.matches += 1
+            return result
+
+        return profiled
+
+    def record_table(self, attempts: Optional[int]):
+        """Count the handlers tried before one matched, or None for no match."""
+        self.attempts[attempts] += 1
+
+    def report(self) -> str:
+        lines = [
+            f'{"Handler":<40} {"Calls":>7} {"Matches":>7} {"Rate":>6} '
+            f'{"Seconds":>9} {"Queries":>8}'
+        ]
+        for name, stats in sorted(
+            self.handlers.items(), key=lambda item: item[1].seconds, reverse=True
+        ):
+            rate = stats.matches / stats.calls if stats.calls else 0
+            lines.append(
+                f'{name:<40} {stats.calls:>7} {stats.matches:>7} {rate:>6.1%} '
+                f'{stats.seconds:>9.3f} {stats.queries:>8}'
+            )
+
+        tables = sum(self.attempts.values())
+        lines.append('')
+        lines.append(f'Handlers tried per table ({tables} tables):')
+        for attempts in sorted(self.attempts, key=lambda a: (a is None, a)):
+            label = 'no match' if attempts is None else attempts
+            lines.append(f'  {label}: {self.attempts[attempts]}')
+
+        return '\n'.join(lines)
+
+
+# Set while parse runs are being profiled
+parser_profile: Optional[ParserProfile] = None
+
+
+@contextmanager
+def profile_parsers() -> Iterator[ParserProfile]:
+    global parser_profile  # pylint: disable=global-statement
+    parser_profile = ParserProfile()
+    try:
+        yield parser_profile
+    finally:
+        parser_profile = None
+
+
+class Registry:
+    """Counters buffered in each process and periodically added to the cache."""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.flushed = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, view: str, **values: float):
+        with self.lock:
+            for name, value in values.items():
+                self.counts[get_key(view, name)] += value
+
+        if time.monotonic() - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed = time.monotonic()
+
+        for key, value in counts.items():
+            value = round(value)
+            if value and not cache.add(key, value, timeout=None):
+                try:
+                    cache.incr(key, value)
+                except ValueError:
+                    cache.set(key, value, timeout=None)
+
+
+registry = Registry()
+
+
+def get_key(view: str, name: str) -> str:
+    return f'elections:metrics:{view}:{name}'
+
+
+def iter_view_names(
+    resolver: Optional[URLResolver] = None, prefix: str = ''
+) -> Iterator[str]:
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            namespace = f'{prefix}{pattern.namespace}:' if pattern.namespace else prefix
+            yield from iter_view_names(pattern, namespace)
+        elif pattern.name:
+            yield prefix + pattern.name
+
+
+@contextmanager
+def serializing(request):
+    """Add the time spent serializing, less its queries, to a sampled request."""
+    request = getattr(request, '_request', request)
+    timer = getattr(request, 'query_timer', None)
+    if timer is None:
+        yield
+        return
+
+    queries = timer.duration
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start - (timer.duration - queries)
+        request.serializer_seconds = getattr(request, 'serializer_seconds', 0.0)
+        request.serializer_seconds += max(0, duration)
+
+
+class MetricsMiddleware:
+    """Record query counts, timings, cache use, and sizes for sampled requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+
+        timer = request.query_timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        serializer = getattr(request, 'serializer_seconds', None)
+        python = max(0, duration - timer.duration - (serializer or 0))
+
+        match = request.resolver_match
+        view = match.view_name if match and match.url_name else OTHER
+        values = {
+            'requests': 1,
+            'queries': timer.count,
+            'db_seconds': timer.duration * 1e6,
+            'python_seconds': python * 1e6,
+        }
+
+        timings = [
+            f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"',
+            f'python;dur={python * 1000:.1f}',
+        ]
+        if serializer is not None:
+            values['serializer_seconds'] = serializer * 1e6
+            timings.append(f'serializer;dur={serializer * 1000:.1f}')
+        cache_hit = getattr(request, 'cache_hit', None)
+        if cache_hit is not None:
+            values['cache_hits' if cache_hit else 'cache_misses'] = 1
+            timings.append(f'cache;desc={"hit" if cache_hit else "miss"}')
+        if not response.streaming:
+            values['response_bytes'] = len(response.content)
+
+        response['Server-Timing'] = ', '.join(timings)
+        registry.add(view, **values)
+        return response
+
+
+def is_authorized(request) -> bool:
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(header, f'Bearer {token}')
+
+
+def export(request):
+    """Expose the counters of every worker in the Prometheus text format."""
+    if not is_authorized(request):
+        return HttpResponseForbidden()
+
+    registry.flush()
+
+    views = sorted(set(iter_view_names())) + [OTHER]
+    keys = [get_key(view, name) for view in views for name, _help, _scale in COUNTERS]
+    values = cache.get_many(keys)
+
+    lines: List[str] = [
+        '# HELP elections_metrics_sample_rate Fraction of requests recorded',
+        '# TYPE elections_metrics_sample_rate gauge',
+        f'elections_metrics_sample_rate {settings.METRICS_SAMPLE_RATE}',
+    ]
+    for name, description, scale in COUNTERS:
+        metric = f'elections_{name}_total'
+        lines.append(f'# HELP {metric} {description}')
+        lines.append(f'# TYPE {metric} counter')
+        for view in views:
+            value = values.get(get_key(view, name))
+            if value is not None:
+                value = value / scale if scale != 1 else value
+                lines.append(f'{metric}{{view="{view}"}} {value}')
+
+    stats = get_crawler_stats()
+    if stats:
+        lines.extend(iter_crawler_lines(stats))
+
+    return HttpResponse(
+        '\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4'
+    )
+
+
+def iter_crawler_lines(stats: Dict[str, Any]) -> Iterator[str]:
+    labels = f'election="{stats["mi_sos_election_id"]}"'
+    for name, kind, description in CRAWLER_METRICS:
+        metric = f'elections_crawler_{name}'
+        yield f'# HELP {metric} {description}'
+        yield f'# TYPE {metric} {kind}'
+        yield f'{metric}{{{labels}}} {stats[name.replace("_total", "")]}'
+
+    weights = stats['refetch_weights']
+    metric = 'elections_crawler_refetch_weight'
+    yield f'# HELP {metric} Refetch weights of the election\'s ballot websites'
+    yield f'# TYPE {metric} histogram'
+    for bucket in REFETCH_WEIGHT_BUCKETS:
+        yield f'{metric}_bucket{{{labels},le="{bucket}"}} {weights[str(bucket)]}'
+    yield f'{metric}_bucket{{{labels},le="+Inf"}} {weights["total"]}'
+    yield f'{metric}_sum{{{labels}}} {weights["sum"] or 0}'
+    yield f'{metric}_count{{{labels}}} {weights["total"]}'
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.6 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [('elections', '0030_auto_20181105_2105')]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ballotwebsite',
+            index=models.Index(
+                fields=['ballot', 'mi_sos_precinct_id'],
+                name='elections_b_ballot__7ea5d4_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='ballotwebsite',
+            index=models.Index(
+                condition=models.Q(source=True),
+                fields=['ballot'],
+                name='elections_website_source_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='district',
+            index=models.Index(fields=['name'], name='elections_d_name_4a4080_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(fields=['active'], name='elections_e_active_435f71_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(
+                fields=['mi_sos_id'], name='elections_e_mi_sos__8c0ee0_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='precinct',
+            index=models.Index(
+                fields=['mi_sos_id'], name='elections_p_mi_sos__410eba_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='precinct',
+            index=models.Index(
+                fields=['ward', 'number'], name='elections_p_ward_9540e4_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [('elections', '0031_indexes')]
+
+    operations = [
+        migrations.AddField(
+            model_name='precinct',
+            name='districts',
+            field=models.ManyToManyField(
+                blank=True, related_name='precincts', to='elections.District'
+            ),
+        )
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 2.2.6 on 2026-10-19 13:23
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+TABLES = ['elections_candidate', 'elections_position', 'elections_proposal']
+
+CREATE_TRIGGERS = """
+CREATE FUNCTION elections_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+""" + ''.join(
+    f"""
+CREATE TRIGGER {table}_search_vector
+    BEFORE INSERT OR UPDATE OF name, description ON {table}
+    FOR EACH ROW EXECUTE PROCEDURE elections_search_vector_update();
+-- Fill in existing rows through the trigger
+UPDATE {table} SET name = name;
+"""
+    for table in TABLES
+)
+
+DROP_TRIGGERS = (
+    ''.join(f'DROP TRIGGER {table}_search_vector ON {table};\n' for table in TABLES)
+    + 'DROP FUNCTION elections_search_vector_update();\n'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [('elections', '0032_precinct_districts')]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='candidate',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name='position',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name='proposal',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'], name='elections_candidate_search_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['name'],
+                name='elections_candidate_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='position',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'], name='elections_position_search_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='position',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['name'],
+                name='elections_position_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'], name='elections_proposal_search_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['name'],
+                name='elections_proposal_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
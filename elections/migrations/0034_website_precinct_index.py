@@ -0,0 +1,17 @@
+# Generated by Django 2.2.6 on 2026-10-19 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [('elections', '0033_search')]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ballotwebsite',
+            index=models.Index(
+                fields=['mi_sos_precinct_id'], name='elections_b_mi_sos__132ae5_idx'
+            ),
+        )
+    ]
@@ -1,19 +1,55 @@
 from __future__ import annotations
 
 import random
-from typing import List, Optional, Union
-
+from functools import reduce
+from operator import or_
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
 import bugsnag
 import log
 import pendulum
-import requests
-from bs4 import BeautifulSoup, element
 from model_utils.models import TimeStampedModel
 
-from . import helpers
+from . import helpers, metrics, versions
+
+
+if TYPE_CHECKING:
+    from bs4 import element
+
+
+class ReferenceCache(dict):
+    """In-process cache of districts that are referenced by every registration.
+
+    Entries are dropped when any process changes districts or categories, and
+    when the cache outgrows its limit.
+    """
+
+    max_size = 10000
+
+    def __init__(self):
+        super().__init__()
+        self.version: Optional[str] = None
+
+    def sync(self, *, keep: bool = False):
+        version = versions.get_data_version(District, DistrictCategory)
+        if not keep and (version != self.version or len(self) >= self.max_size):
+            self.clear()
+        self.version = version
+
+
+_districts = ReferenceCache()
+
+
+def clear_reference_cache():
+    _districts.clear()
 
 
 class DistrictCategory(TimeStampedModel):
@@ -30,6 +66,22 @@ class DistrictCategory(TimeStampedModel):
             return self.name
         return f'{self.name} District'
 
+    @classmethod
+    def resolve(cls, names: Set[str]) -> Dict[str, DistrictCategory]:
+        """Get or create categories by name in bulk."""
+        categories = {c.name: c for c in cls.objects.filter(name__in=names)}
+        missing = names - categories.keys()
+        if missing:
+            cls.objects.bulk_create(
+                [cls(name=name) for name in missing], ignore_conflicts=True
+            )
+            for name in sorted(missing):
+                log.info(f"New category: {name}")
+            # Bulk inserts skip the signals that invalidate cached responses
+            versions.bump_data_version(cls)
+            categories.update((c.name, c) for c in cls.objects.filter(name__in=missing))
+        return categories
+
 
 class District(TimeStampedModel):
     """Districts bound to ballot items."""
@@ -40,6 +92,7 @@ class District(TimeStampedModel):
 
     class Meta:
         unique_together = ['category', 'name']
+        indexes = [models.Index(fields=['name'])]
         ordering = ['-population']
 
     def __repr__(self) -> str:
@@ -48,6 +101,43 @@ class District(TimeStampedModel):
     def __str__(self) -> str:
         return self.name
 
+    @classmethod
+    def resolve(cls, pairs: List[Tuple[str, str]]) -> List[District]:
+        """Get or create districts by (category name, district name) in bulk."""
+        # Other greenlets can clear the shared cache during queries, so only
+        # read from it up front and collect everything else locally
+        _districts.sync()
+        found = {pair: _districts[pair] for pair in pairs if pair in _districts}
+        missing = set(pairs) - found.keys()
+        if missing:
+            found.update(cls._load(missing))
+            missing -= found.keys()
+        if missing:
+            categories = DistrictCategory.resolve({name for name, _ in missing})
+            cls.objects.bulk_create(
+                [cls(category=categories[c], name=n) for c, n in missing],
+                ignore_conflicts=True,
+            )
+            for category_name, name in sorted(missing):
+                log.info(f"New district: {name} ({category_name})")
+            versions.bump_data_version(cls)
+            loaded = cls._load(missing)
+            found.update(loaded)
+            # Entries are current after this process's own inserts
+            _districts.sync(keep=True)
+            _districts.update(loaded)
+        return [found[pair] for pair in pairs]
+
+    @classmethod
+    def _load(cls, pairs: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], District]:
+        query = reduce(or_, (Q(category__name=c, name=n) for c, n in pairs))
+        loaded = {
+            (district.category.name, district.name): district
+            for district in cls.objects.filter(query).select_related('category')
+        }
+        _districts.update(loaded)
+        return loaded
+
 
 class Election(TimeStampedModel):
     """Point in time where voters can cast opinions on ballot items."""
@@ -62,11 +152,21 @@ class Election(TimeStampedModel):
 
     class Meta:
         unique_together = ['date', 'name']
+        indexes = [models.Index(fields=['active']), models.Index(fields=['mi_sos_id'])]
         ordering = ['date']
 
     def __str__(self) -> str:
         return ' | '.join(self.mi_sos_name)
 
+    @property
+    def kind(self) -> str:
+        """Type of election, which determines how its ballots are parsed."""
+        name = self.name.lower()
+        for kind in ['primary', 'consolidated', 'special']:
+            if kind in name:
+                return kind
+        return 'general'
+
     @property
     def mi_sos_name(self) -> List[str]:
         return [
@@ -93,8 +193,15 @@ class Precinct(TimeStampedModel):
 
     mi_sos_id = models.PositiveIntegerField()
 
+    # Districts the MI SOS last reported for voters registered in this precinct
+    districts = models.ManyToManyField(District, blank=True, related_name='precincts')
+
     class Meta:
         unique_together = ['county', 'jurisdiction', 'ward', 'number']
+        indexes = [
+            models.Index(fields=['mi_sos_id']),
+            models.Index(fields=['ward', 'number']),
+        ]
         ordering = ['mi_sos_id']
 
     def __str__(self) -> str:
@@ -124,6 +231,25 @@ class Precinct(TimeStampedModel):
         assert self.mi_sos_name
         super().save(*args, **kwargs)
 
+    def set_districts(self, districts: Iterable[District]):
+        """Replace the districts recorded from this precinct's registrations."""
+        through = Precinct.districts.through
+        links = through.objects.filter(precinct=self)
+        known = set(links.values_list('district', flat=True))
+        ids = {district.id for district in districts}
+        if known == ids:
+            return
+
+        if known - ids:
+            links.filter(district__in=known - ids).delete()
+        if ids - known:
+            through.objects.bulk_create(
+                [through(precinct=self, district_id=pk) for pk in ids - known],
+                ignore_conflicts=True,
+            )
+        # No API response includes these links, so cached responses built
+        # from precincts stay valid and no data version is bumped
+
 
 class RegistrationStatus(models.Model):
     """Status of a particular voter's registration."""
@@ -160,15 +286,64 @@ class Voter(models.Model):
     def birth_year(self) -> int:
         return self.birth_date.year
 
+    @property
+    def identity(self) -> Tuple[str, str, int, int, str]:
+        return (
+            ' '.join(self.first_name.split()).lower(),
+            ' '.join(self.last_name.split()).lower(),
+            self.birth_month,
+            self.birth_year,
+            str(self.zip_code).strip(),
+        )
+
     def fetch_registration_status(self) -> RegistrationStatus:
-        data = helpers.fetch_registration_status_data(self)
+        status = self.get_cached_registration_status()
+        if status is None:
+            data = helpers.fetch_registration_status_data(self)
+            status = self.resolve_registration_status(data)
+            self.cache_registration_status(data, status)
+        return status
 
-        if not data['registered']:
+    def get_cached_registration_status(self) -> Optional[RegistrationStatus]:
+        value = cache.get(helpers.get_registration_key(self))
+        if value is None:
+            return None
+        if not value['registered']:
             return RegistrationStatus(registered=False)
 
-        districts: List[District] = []
-        county = jurisdiction = None
+        precincts = Precinct.objects.select_related('county', 'jurisdiction')
+        precinct = precincts.filter(id=value['precinct']).first()
+        if precinct is None:
+            return None
+
+        districts = list(
+            precinct.districts.select_related('category').order_by(
+                'category__name', 'name'
+            )
+        )
+        if not districts:
+            return None
+
+        status = RegistrationStatus(registered=True, precinct=precinct)
+        status.districts = districts
+        return status
 
+    def cache_registration_status(self, data: Dict, status: RegistrationStatus):
+        # Only the precinct is cached, districts come from the lookup table
+        key = helpers.get_registration_key(self)
+        if data['registered']:
+            value = {'registered': True, 'precinct': status.precinct.id}
+            cache.set(key, value, timeout=settings.REGISTRATION_CACHE_TIMEOUT)
+        elif data['registered'] is False:
+            value = {'registered': False, 'precinct': None}
+            cache.set(key, value, timeout=settings.REGISTRATION_NEGATIVE_CACHE_TIMEOUT)
+
+    @staticmethod
+    def resolve_registration_status(data: Dict) -> RegistrationStatus:
+        if not data['registered']:
+            return RegistrationStatus(registered=False)
+
+        pairs: List[Tuple[str, str]] = []
         for category_name, district_name in sorted(data['districts'].items()):
             if not (category_name and district_name):
                 log.warn("Skipped blank MI SOS district")
@@ -178,22 +353,13 @@ class Voter(models.Model):
                 log.debug(f"Skipped category: {category_name}")
                 continue
 
-            category, created = DistrictCategory.objects.get_or_create(
-                name=category_name
-            )
-            if created:
-                log.info(f"New category: {category}")
-
-            if category.name == "County":
+            if category_name == "County":
                 district_name = district_name.replace(" County", "")
-            district, created = District.objects.get_or_create(
-                category=category, name=district_name
-            )
-            if created:
-                log.info(f"New district: {district}")
-
-            districts.append(district)
+            pairs.append((category_name, district_name))
 
+        districts = District.resolve(pairs)
+        county = jurisdiction = None
+        for district in districts:
             if district.category.name == "County":
                 county = district
             if district.category.name == "Jurisdiction":
@@ -206,6 +372,8 @@ class Voter(models.Model):
             number=data['districts']['Precinct'],
             defaults=dict(mi_sos_id=0),
         )
+        precinct.county = county
+        precinct.jurisdiction = jurisdiction
         if created:
             log.info(f"New precinct: {precinct}")
         if not precinct.mi_sos_id:
@@ -213,6 +381,7 @@ class Voter(models.Model):
 
         status = RegistrationStatus(registered=data['registered'], precinct=precinct)
         status.districts = districts
+        precinct.set_districts(districts)
 
         return status
 
@@ -285,6 +454,15 @@ class BallotWebsite(models.Model):
 
     class Meta:
         unique_together = ['mi_sos_election_id', 'mi_sos_precinct_id']
+        indexes = [
+            models.Index(fields=['ballot', 'mi_sos_precinct_id']),
+            models.Index(fields=['mi_sos_precinct_id']),
+            models.Index(
+                fields=['ballot'],
+                name='elections_website_source_idx',
+                condition=models.Q(source=True),
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.mi_sos_url
@@ -300,6 +478,9 @@ class BallotWebsite(models.Model):
         return self.refetch_weight > random.random()
 
     def fetch(self):
+        import requests  # pylint: disable=import-outside-toplevel
+        from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
         url = self.mi_sos_url
 
         log.info(f'Fetching {url}')
@@ -347,6 +528,8 @@ class BallotWebsite(models.Model):
         self.save()
 
     def parse(self):
+        from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
         log.info(f'Parsing HTML for ballot: {self}')
         soup = BeautifulSoup(self.mi_sos_html, 'html.parser')
 
@@ -407,19 +590,14 @@ class BallotWebsite(models.Model):
     ) -> Union[None, Party, Position, Proposal]:
         from . import legacy_parsers
 
-        for handler in [
-            # legacy_parsers.handle_primary_header,
-            # legacy_parsers.handle_party_section,
-            # legacy_parsers.handle_partisan_section,
-            legacy_parsers.general.handle_main_wrapper,
-            legacy_parsers.general.handle_general_wrapper,
-            legacy_parsers.general.handle_partisan_section,
-            # legacy_parsers.handle_general_header,
-            legacy_parsers.general.handle_nonpartisan_section,
-            # legacy_parsers.handle_nonpartisan_positions,
-            legacy_parsers.general.handle_proposals_header,
-            legacy_parsers.general.handle_proposals,
-        ]:
+        profile = metrics.parser_profile
+        pipeline = legacy_parsers.get_pipeline(election.kind)
+        handlers, lookups = pipeline.select(table, party=party)
+
+        for attempts, handler in enumerate(handlers, start=1):
+            if profile:
+                handler = profile.wrap(handler)
+
             try:
                 result = handler(  # type: ignore
                     table,
@@ -427,14 +605,19 @@ class BallotWebsite(models.Model):
                     precinct=precinct,
                     party=party,
                     district=district,
+                    **lookups,
                 )
             except Exception as e:
                 print(table.prettify())
                 raise e from None
 
             if result:
+                if profile:
+                    profile.record_table(attempts)
                 return result
 
+        if profile:
+            profile.record_table(None)
         return None
 
 
@@ -448,6 +631,9 @@ class BallotItem(TimeStampedModel):
     description = models.TextField(blank=True)
     reference_url = models.URLField(blank=True, null=True)
 
+    # Maintained by a database trigger from the name and description
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         abstract = True
 
@@ -457,6 +643,14 @@ class Proposal(BallotItem):
 
     class Meta:
         unique_together = ['election', 'district', 'name']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='elections_proposal_search_idx'),
+            GinIndex(
+                fields=['name'],
+                name='elections_proposal_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
         ordering = ['name']
 
     def __str__(self):
@@ -471,6 +665,14 @@ class Position(BallotItem):
 
     class Meta:
         unique_together = ['election', 'district', 'name', 'term', 'seats']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='elections_position_search_idx'),
+            GinIndex(
+                fields=['name'],
+                name='elections_position_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
         ordering = ['name', 'seats']
 
     def __str__(self):
@@ -492,8 +694,19 @@ class Candidate(TimeStampedModel):
     reference_url = models.URLField(blank=True, null=True)
     party = models.ForeignKey(Party, blank=True, null=True, on_delete=models.SET_NULL)
 
+    # Maintained by a database trigger from the name and description
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         unique_together = ['position', 'name']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='elections_candidate_search_idx'),
+            GinIndex(
+                fields=['name'],
+                name='elections_candidate_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
         ordering = ['name']
 
     def __str__(self) -> str:
@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from . import models
+
+
+class NormalizedRank(SearchRank):
+    """ts_rank scaled into [0, 1) by rank / (rank + 1), like trigram similarity."""
+
+    template = '%(function)s(%(expressions)s, 32)'
+
+
+# Result types and the path from each model to its election
+SEARCH_MODELS = {
+    'candidate': (models.Candidate, 'position__election'),
+    'position': (models.Position, 'election'),
+    'proposal': (models.Proposal, 'election'),
+}
+
+
+def search(
+    text: str, *, election_id: Optional[int] = None, limit: int = 20
+) -> List[Dict]:
+    """Rank ballot items by full-text match, or by name similarity for typos.
+
+    Both conditions are served by GIN indexes, so each type is limited before
+    the results are merged.
+    """
+    query = SearchQuery(text, config='english')
+
+    results: List[Dict] = []
+    for kind, (model, election) in SEARCH_MODELS.items():
+        queryset = model.objects.filter(
+            Q(search_vector=query) | Q(name__trigram_similar=text),
+            # Candidates without a position have no election to link
+            **{f'{election}__isnull': False},
+        )
+        if election_id is not None:
+            queryset = queryset.filter(**{f'{election}__id': election_id})
+
+        rows = (
+            queryset.annotate(
+                rank=Greatest(
+                    NormalizedRank(F('search_vector'), query),
+                    TrigramSimilarity('name', text),
+                )
+            )
+            .order_by('-rank', 'id')
+            .values_list('id', 'name', 'description', election, 'rank')[:limit]
+        )
+        for pk, name, description, election_pk, rank in rows:
+            results.append(
+                {
+                    'type': kind,
+                    'id': pk,
+                    'name': name,
+                    'description': description,
+                    'election_id': election_pk,
+                    'rank': rank,
+                }
+            )
+
+    results.sort(key=lambda row: row['rank'], reverse=True)
+    return results[:limit]
@@ -1,6 +1,50 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from rest_framework.utils.field_mapping import get_detail_view_name
+
+from . import fields, helpers, models
+
+
+def get_sparse_fields(request) -> Optional[Tuple[Optional[Set], Optional[Set]]]:
+    """Parse the 'fields' and 'expand' query parameters, if either was given."""
+    params = request.GET if request else {}
+    if 'fields' not in params and 'expand' not in params:
+        return None
+
+    names, expand = [
+        {name.strip() for name in params[key].split(',') if name.strip()}
+        if key in params
+        else None
+        for key in ['fields', 'expand']
+    ]
+    return names, expand
+
 
-from . import fields, models
+class SparseFieldsMixin:
+    """Limit top-level fields and collapse nested objects into hyperlinks."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)  # type: ignore
+
+        sparse = get_sparse_fields(self.context.get('request'))  # type: ignore
+        if sparse is None:
+            return
+        names, expand = sparse
+
+        expandable = getattr(self.Meta, 'expandable_fields', [])  # type: ignore
+        for name, field in list(self.fields.items()):  # type: ignore
+            if names is not None and name not in names:
+                self.fields.pop(name)  # type: ignore
+            elif name in expandable and expand is not None and name not in expand:
+                many = isinstance(field, serializers.ListSerializer)
+                model = (field.child if many else field).Meta.model
+                self.fields[name] = serializers.HyperlinkedRelatedField(  # type: ignore
+                    view_name=get_detail_view_name(model), many=many, read_only=True
+                )
 
 
 class VoterSerializer(serializers.ModelSerializer):
@@ -9,13 +53,15 @@ class VoterSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class DistrictCategorySerializer(serializers.HyperlinkedModelSerializer):
+class DistrictCategorySerializer(
+    SparseFieldsMixin, serializers.HyperlinkedModelSerializer
+):
     class Meta:
         model = models.DistrictCategory
         fields = ['url', 'id', 'name']
 
 
-class DistrictSerializer(serializers.HyperlinkedModelSerializer):
+class DistrictSerializer(SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
 
     category = serializers.CharField()
 
@@ -24,13 +70,13 @@ class DistrictSerializer(serializers.HyperlinkedModelSerializer):
         fields = ['url', 'id', 'category', 'name']
 
 
-class ElectionSerializer(serializers.ModelSerializer):
+class ElectionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Election
         fields = ['url', 'id', 'name', 'date', 'active', 'reference_url']
 
 
-class PrecinctSerializer(serializers.HyperlinkedModelSerializer):
+class PrecinctSerializer(SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
 
     county = serializers.CharField()
     jurisdiction = serializers.CharField()
@@ -42,7 +88,7 @@ class PrecinctSerializer(serializers.HyperlinkedModelSerializer):
         fields = ['url', 'id', 'county', 'jurisdiction', 'ward', 'number']
 
 
-class BallotSerializer(serializers.HyperlinkedModelSerializer):
+class BallotSerializer(SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
 
     election = ElectionSerializer()
     precinct = PrecinctSerializer()
@@ -50,9 +96,10 @@ class BallotSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = models.Ballot
         fields = ['url', 'id', 'election', 'precinct', 'mi_sos_url']
+        expandable_fields = ['election', 'precinct']
 
 
-class ProposalSerializer(serializers.HyperlinkedModelSerializer):
+class ProposalSerializer(SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
 
     election = ElectionSerializer()
     district = DistrictSerializer()
@@ -68,23 +115,25 @@ class ProposalSerializer(serializers.HyperlinkedModelSerializer):
             'election',
             'district',
         ]
+        expandable_fields = ['election', 'district']
 
 
-class PartySerializer(serializers.HyperlinkedModelSerializer):
+class PartySerializer(SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
     class Meta:
         model = models.Party
         fields = ['url', 'id', 'name', 'color']
 
 
-class CandidateSerializer(serializers.HyperlinkedModelSerializer):
+class CandidateSerializer(SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
     party = PartySerializer()
 
     class Meta:
         model = models.Candidate
         fields = ['url', 'id', 'name', 'description', 'reference_url', 'party']
+        expandable_fields = ['party']
 
 
-class PositionSerializer(serializers.HyperlinkedModelSerializer):
+class PositionSerializer(SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
 
     candidates = CandidateSerializer(many=True)
     election = ElectionSerializer()
@@ -103,6 +152,7 @@ class PositionSerializer(serializers.HyperlinkedModelSerializer):
             'election',
             'district',
         ]
+        expandable_fields = ['candidates', 'election', 'district']
 
 
 class RegistrationStatusSerializer(serializers.HyperlinkedModelSerializer):
@@ -112,3 +162,258 @@ class RegistrationStatusSerializer(serializers.HyperlinkedModelSerializer):
 
     precinct = PrecinctSerializer()
     districts = DistrictSerializer(many=True)
+
+
+###############################################################################
+# Read-only serializers built from '.values()' rows to skip per-object reversing
+
+
+def get_url_prefix(view_name: str, request) -> str:
+    url = reverse(view_name, kwargs={'pk': 0}, request=request)
+    assert url.endswith('/0/'), f"Unexpected detail URL: {url}"
+    return url[:-2]
+
+
+class ValuesSerializer(ABC):
+    """Produces the same data as the hyperlinked serializers for list pages."""
+
+    view_names = [
+        'ballot-detail',
+        'candidate-detail',
+        'district-detail',
+        'election-detail',
+        'party-detail',
+        'position-detail',
+        'precinct-detail',
+        'proposal-detail',
+    ]
+    fields: List[str] = []
+
+    def __init__(self, request):
+        self.urls = {name: get_url_prefix(name, request) for name in self.view_names}
+        self.categories: Dict[str, str] = {}
+
+    def get_queryset(self, queryset):
+        return queryset.prefetch_related(None).values(*self.fields)
+
+    @abstractmethod
+    def to_representation(self, rows: List[dict]) -> List[OrderedDict]:
+        """Build the response items for a page of '.values()' rows."""
+
+    def get_url(self, view_name: str, pk: int) -> str:
+        return f'{self.urls[view_name]}{pk}/'
+
+    def get_category(self, name: str) -> str:
+        if name not in self.categories:
+            self.categories[name] = str(models.DistrictCategory(name=name))
+        return self.categories[name]
+
+    def build_election(self, row: dict, prefix='election__') -> OrderedDict:
+        date = row[prefix + 'date']
+        return OrderedDict(
+            [
+                ('url', self.get_url('election-detail', row[prefix + 'id'])),
+                ('id', row[prefix + 'id']),
+                ('name', row[prefix + 'name']),
+                ('date', date.isoformat()),
+                ('active', row[prefix + 'active']),
+                ('reference_url', row[prefix + 'reference_url']),
+            ]
+        )
+
+    def build_district(self, row: dict, prefix='district__') -> Optional[OrderedDict]:
+        if row[prefix + 'id'] is None:
+            return None
+        return OrderedDict(
+            [
+                ('url', self.get_url('district-detail', row[prefix + 'id'])),
+                ('id', row[prefix + 'id']),
+                ('category', self.get_category(row[prefix + 'category__name'])),
+                ('name', row[prefix + 'name']),
+            ]
+        )
+
+    def build_precinct(self, row: dict, prefix='precinct__') -> OrderedDict:
+        return OrderedDict(
+            [
+                ('url', self.get_url('precinct-detail', row[prefix + 'id'])),
+                ('id', row[prefix + 'id']),
+                ('county', row[prefix + 'county__name']),
+                ('jurisdiction', row[prefix + 'jurisdiction__name']),
+                ('ward', row[prefix + 'ward'] or None),
+                ('number', row[prefix + 'number'] or None),
+            ]
+        )
+
+    def build_party(self, row: dict, prefix='party__') -> Optional[OrderedDict]:
+        if row[prefix + 'id'] is None:
+            return None
+        return OrderedDict(
+            [
+                ('url', self.get_url('party-detail', row[prefix + 'id'])),
+                ('id', row[prefix + 'id']),
+                ('name', row[prefix + 'name']),
+                ('color', row[prefix + 'color']),
+            ]
+        )
+
+    def build_candidate(self, row: dict) -> OrderedDict:
+        return OrderedDict(
+            [
+                ('url', self.get_url('candidate-detail', row['id'])),
+                ('id', row['id']),
+                ('name', row['name']),
+                ('description', row['description']),
+                ('reference_url', row['reference_url']),
+                ('party', self.build_party(row)),
+            ]
+        )
+
+
+ELECTION_FIELDS = [
+    'election__id',
+    'election__name',
+    'election__date',
+    'election__active',
+    'election__reference_url',
+]
+DISTRICT_FIELDS = ['district__id', 'district__category__name', 'district__name']
+PRECINCT_FIELDS = [
+    'precinct__id',
+    'precinct__county__name',
+    'precinct__jurisdiction__name',
+    'precinct__ward',
+    'precinct__number',
+]
+PARTY_FIELDS = ['party__id', 'party__name', 'party__color']
+CANDIDATE_FIELDS = ['id', 'name', 'description', 'reference_url', *PARTY_FIELDS]
+
+
+class PrecinctValuesSerializer(ValuesSerializer):
+
+    fields = ['id', 'county__name', 'jurisdiction__name', 'ward', 'number']
+
+    def to_representation(self, rows):
+        return [self.build_precinct(row, prefix='') for row in rows]
+
+
+class BallotValuesSerializer(ValuesSerializer):
+
+    fields = [
+        'id',
+        *ELECTION_FIELDS,
+        'election__mi_sos_id',
+        *PRECINCT_FIELDS,
+        'precinct__mi_sos_id',
+    ]
+
+    def to_representation(self, rows):
+        return [
+            OrderedDict(
+                [
+                    ('url', self.get_url('ballot-detail', row['id'])),
+                    ('id', row['id']),
+                    ('election', self.build_election(row)),
+                    ('precinct', self.build_precinct(row)),
+                    (
+                        'mi_sos_url',
+                        helpers.build_mi_sos_url(
+                            election_id=row['election__mi_sos_id'],
+                            precinct_id=row['precinct__mi_sos_id'],
+                        ),
+                    ),
+                ]
+            )
+            for row in rows
+        ]
+
+
+class ProposalValuesSerializer(ValuesSerializer):
+
+    fields = [
+        'id',
+        'name',
+        'description',
+        'reference_url',
+        *ELECTION_FIELDS,
+        *DISTRICT_FIELDS,
+    ]
+
+    def to_representation(self, rows):
+        return [
+            OrderedDict(
+                [
+                    ('url', self.get_url('proposal-detail', row['id'])),
+                    ('id', row['id']),
+                    ('name', row['name']),
+                    ('description', row['description']),
+                    ('reference_url', row['reference_url']),
+                    ('election', self.build_election(row)),
+                    ('district', self.build_district(row)),
+                ]
+            )
+            for row in rows
+        ]
+
+
+class CandidateValuesSerializer(ValuesSerializer):
+
+    fields = CANDIDATE_FIELDS
+
+    def to_representation(self, rows):
+        return [self.build_candidate(row) for row in rows]
+
+
+class PositionValuesSerializer(ValuesSerializer):
+
+    fields = [
+        'id',
+        'name',
+        'description',
+        'reference_url',
+        'seats',
+        *ELECTION_FIELDS,
+        *DISTRICT_FIELDS,
+    ]
+
+    def to_representation(self, rows):
+        candidates: Dict[int, List[OrderedDict]] = defaultdict(list)
+        for row in models.Candidate.objects.filter(
+            position__in=[row['id'] for row in rows]
+        ).values('position_id', *CANDIDATE_FIELDS):
+            candidates[row['position_id']].append(self.build_candidate(row))
+
+        return [
+            OrderedDict(
+                [
+                    ('url', self.get_url('position-detail', row['id'])),
+                    ('id', row['id']),
+                    ('name', row['name']),
+                    ('description', row['description']),
+                    ('reference_url', row['reference_url']),
+                    ('seats', row['seats']),
+                    ('candidates', candidates[row['id']]),
+                    ('election', self.build_election(row)),
+                    ('district', self.build_district(row)),
+                ]
+            )
+            for row in rows
+        ]
+
+
+class SearchResultValuesSerializer(ValuesSerializer):
+    def to_representation(self, rows):
+        return [
+            OrderedDict(
+                [
+                    ('type', row['type']),
+                    ('url', self.get_url(f"{row['type']}-detail", row['id'])),
+                    ('id', row['id']),
+                    ('name', row['name']),
+                    ('description', row['description']),
+                    ('election', self.get_url('election-detail', row['election_id'])),
+                    ('rank', round(row['rank'], 4)),
+                ]
+            )
+            for row in rows
+        ]
@@ -0,0 +1,24 @@
+# pylint: disable=protected-access
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import models, versions
+
+
+@receiver([post_save, post_delete])
+def bump_model_version(sender, **_kwargs):
+    if sender._meta.app_label == 'elections':
+        versions.bump_data_version(sender)
+
+
+@receiver([post_save, post_delete], sender=models.District)
+@receiver([post_save, post_delete], sender=models.DistrictCategory)
+def clear_reference_cache(**_kwargs):
+    models.clear_reference_cache()
+
+
+@receiver(m2m_changed)
+def bump_relation_version(sender, instance, action, model, **_kwargs):
+    if action.startswith('post_') and model._meta.app_label == 'elections':
+        versions.bump_data_version(type(instance), model)
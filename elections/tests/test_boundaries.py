@@ -0,0 +1,108 @@
+# pylint: disable=unused-variable
+
+import pytest
+
+from .. import boundaries
+
+
+def _square(left, bottom, size=1.0):
+    return [
+        (left, bottom),
+        (left + size, bottom),
+        (left + size, bottom + size),
+        (left, bottom + size),
+        (left, bottom),
+    ]
+
+
+def describe_boundary():
+    @pytest.fixture
+    def boundary():
+        # A square with a square hole in the middle
+        return boundaries.Boundary(
+            ('Kent', 'City of Grand Rapids', '1', '1'),
+            [_square(0, 0, size=3), _square(1, 1)],
+        )
+
+    def it_contains_inner_points(expect, boundary):
+        expect(boundary.contains(0.5, 2.5)) == True
+
+    def it_excludes_outer_points(expect, boundary):
+        expect(boundary.contains(3.5, 0.5)) == False
+
+    def it_excludes_holes(expect, boundary):
+        expect(boundary.contains(1.5, 1.5)) == False
+
+
+def describe_boundary_index():
+    @pytest.fixture
+    def index():
+        return boundaries.BoundaryIndex(
+            (boundaries.Boundary(('', '', '', str(n)), [_square(x, y)]), n)
+            for n, (x, y) in enumerate(
+                [(x, y) for x in range(10) for y in range(10)], start=1
+            )
+        )
+
+    def it_locates_the_containing_boundary(expect, index):
+        expect(index.locate(3.5, 2.5)) == 24
+
+    def it_returns_none_outside_every_boundary(expect, index):
+        expect(index.locate(42.96, -85.67)) == None
+
+    def it_handles_empty_indexes(expect):
+        expect(boundaries.BoundaryIndex([]).locate(0.5, 0.5)) == None
+
+
+def describe_parse():
+    def it_reads_polygons_and_multipolygons(expect):
+        data = {
+            'type': 'FeatureCollection',
+            'features': [
+                {
+                    'type': 'Feature',
+                    'properties': {'county': "Kent", 'ward': 1, 'number': '2'},
+                    'geometry': {'type': 'Polygon', 'coordinates': [_square(0, 0)]},
+                },
+                {
+                    'type': 'Feature',
+                    'properties': {'county': "Kent", 'ward': None, 'number': '3'},
+                    'geometry': {
+                        'type': 'MultiPolygon',
+                        'coordinates': [[_square(2, 0)], [_square(4, 0)]],
+                    },
+                },
+            ],
+        }
+
+        first, second = boundaries.parse(data)
+
+        expect(first.key) == ('Kent', '', '1', '2')
+        expect(second.key) == ('Kent', '', '', '3')
+        expect(len(second.rings)) == 2
+        expect(second.box) == (2.0, 0.0, 5.0, 1.0)
+
+    def it_skips_empty_rings(expect):
+        data = {
+            'type': 'FeatureCollection',
+            'features': [
+                {
+                    'type': 'Feature',
+                    'properties': {'county': "Kent", 'number': '1'},
+                    'geometry': {'type': 'Polygon', 'coordinates': [[]]},
+                },
+                {
+                    'type': 'Feature',
+                    'properties': {'county': "Kent", 'number': '2'},
+                    'geometry': {
+                        'type': 'MultiPolygon',
+                        'coordinates': [[[]], [_square(0, 0)]],
+                    },
+                },
+            ],
+        }
+
+        (boundary,) = boundaries.parse(data)
+
+        expect(boundary.key) == ('Kent', '', '', '2')
+        expect(len(boundary.rings)) == 1
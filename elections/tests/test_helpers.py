@@ -1,9 +1,16 @@
 # pylint: disable=unused-variable
 
+import gzip
 import os
+import re
+from types import SimpleNamespace
+
+from django.core.cache import cache
 
 import pendulum
 import pytest
+import requests
+import yaml
 
 from .. import helpers, models
 
@@ -18,6 +25,26 @@ def voter():
     )
 
 
+class Clock:
+    def __init__(self):
+        self.now = 1000.5
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(helpers, 'time', clock)
+    return clock
+
+
 @pytest.fixture
 def moved_voter():
     pytest.skip("Moved voter required")
@@ -65,3 +92,148 @@ def describe_fetch_registration_status_data():
         expect(data['registered']) == True
         expect(data['districts']['Ward']) == '1'
         expect(data['districts']['Precinct']) == '6'
+
+
+def describe_get_registration_key():
+    def it_ignores_case_and_whitespace(expect, voter):
+        retry = models.Voter(
+            first_name=" rosalynn ",
+            last_name="BLISS",
+            birth_date=pendulum.parse("1975-08-30"),
+            zip_code="49503",
+        )
+
+        expect(helpers.get_registration_key(retry)) == helpers.get_registration_key(
+            voter
+        )
+
+    def it_hides_the_identity(expect, voter):
+        expect(helpers.get_registration_key(voter)).excludes("bliss")
+
+
+def describe_iter_labeled_values():
+    @pytest.fixture
+    def html():
+        path = os.path.join(
+            os.path.dirname(__file__), 'cassettes', 'with_known_voter.yaml'
+        )
+        with open(path) as f:
+            cassette = yaml.load(f, Loader=yaml.Loader)
+        body = cassette['interactions'][0]['response']['body']['string']
+        return gzip.decompress(body).decode()
+
+    def it_matches_the_original_pattern(expect, html):
+        pairs = list(helpers.iter_labeled_values(html))
+
+        expect(pairs) == re.findall(r'>([\w ]+):[\s\S]*?">([\w ]*)<', html)
+        expect(pairs).contains(('Ward', ' 2'))
+
+    @pytest.mark.parametrize(
+        'html',
+        [
+            '<b>Label:</b><span id="x">Value</span>',
+            '<b>Label:</b><a href="x">Value-1</a><span class="y">Value 2</span>',
+            '<b>First:</b><b>Second:</b><span>Unmatched</span>',
+            '>:"><',
+            'no labels: at all',
+        ],
+    )
+    def it_matches_the_original_pattern_on_edge_cases(expect, html):
+        pairs = list(helpers.iter_labeled_values(html))
+
+        expect(pairs) == re.findall(r'>([\w ]+):[\s\S]*?">([\w ]*)<', html)
+
+
+def describe_check_availability():
+    def _response(html, status_code=200):
+        return SimpleNamespace(text=html, status_code=status_code)
+
+    def it_ignores_a_hidden_error(expect):
+        html = '<div id="pollingLocationError" style="display:none;">Error</div>'
+
+        helpers.check_availability(_response(html))
+
+    def it_raises_for_a_visible_error(expect):
+        html = "<p>#pollingLocationError</p><div class='x' id='pollingLocationError'>"
+
+        with expect.raises(helpers.ServiceUnavailable):
+            helpers.check_availability(_response(html))
+
+
+def describe_request_mi_sos():
+    def it_fails_fast_when_the_website_is_unresponsive(expect, monkeypatch):
+        def request(*args, timeout, **kwargs):
+            raise requests.Timeout(f"Read timed out. (read timeout={timeout})")
+
+        monkeypatch.setattr(requests, 'request', request)
+
+        with expect.raises(helpers.ServiceUnavailable):
+            helpers.request_mi_sos('GET', helpers.MI_SOS_URL)
+
+
+def describe_wait_for_rate_limit():
+    @pytest.fixture
+    def clock(clock):
+        cache.delete_many(['mi_sos:requests:1000', 'mi_sos:requests:1001'])
+        return clock
+
+    def it_waits_for_the_next_second_once_the_budget_is_spent(expect, settings, clock):
+        settings.MI_SOS_REQUESTS_PER_SECOND = 2
+
+        for _ in range(3):
+            helpers.wait_for_rate_limit()
+
+        expect(clock.sleeps) == [0.5]
+        expect(cache.get('mi_sos:requests:1001')) == 1
+
+
+def describe_circuit_breaker():
+    @pytest.fixture
+    def breaker(clock):
+        breaker = helpers.CircuitBreaker('test', threshold=2, cooldown=30)
+        cache.delete_many([breaker.failures_key, breaker.opened_key, breaker.probe_key])
+        return breaker
+
+    def _fail(breaker):
+        with pytest.raises(helpers.ServiceUnavailable):
+            with helpers.CircuitBreaker('test', breaker.threshold, breaker.cooldown):
+                raise helpers.ServiceUnavailable()
+
+    def _succeed(breaker):
+        with helpers.CircuitBreaker('test', breaker.threshold, breaker.cooldown):
+            pass
+
+    def it_trips_after_consecutive_failures(expect, breaker, clock):
+        _fail(breaker)
+        _succeed(breaker)
+        _fail(breaker)
+        _fail(breaker)
+        clock.now += 10
+
+        with pytest.raises(helpers.ServiceUnavailable) as excinfo:
+            _succeed(breaker)
+
+        expect(excinfo.value.wait) == 20
+
+    def it_lets_one_probe_through_after_the_cooldown(expect, breaker, clock):
+        _fail(breaker)
+        _fail(breaker)
+        clock.now += 30
+
+        with helpers.CircuitBreaker('test', breaker.threshold, breaker.cooldown):
+            with expect.raises(helpers.ServiceUnavailable):
+                _succeed(breaker)
+
+        _succeed(breaker)
+        expect(cache.get(breaker.opened_key)) == None
+
+    def it_reopens_when_the_probe_fails(expect, breaker, clock):
+        _fail(breaker)
+        _fail(breaker)
+        clock.now += 30
+
+        _fail(breaker)
+
+        with pytest.raises(helpers.ServiceUnavailable) as excinfo:
+            _succeed(breaker)
+        expect(excinfo.value.wait) == 30
@@ -1,10 +1,13 @@
 # pylint: disable=unused-variable,unused-argument,expression-not-assigned
 
 
+from django.core.cache import cache
+
 import pendulum
 import pytest
+from bs4 import BeautifulSoup
 
-from .. import models
+from .. import helpers, metrics, models, versions
 
 
 @pytest.fixture
@@ -76,6 +79,109 @@ def describe_voter_identity():
             expect(voter.birth_year) == 1985
 
 
+def describe_voter_registration():
+    @pytest.fixture
+    def data():
+        return {
+            'registered': True,
+            'districts': {
+                'County': "Kent County",
+                'Jurisdiction': "City of Grand Rapids",
+                'School': "Grand Rapids Public Schools",
+                'Village': "",
+                'Ward': "2",
+                'Precinct': "30",
+            },
+        }
+
+    @pytest.fixture
+    def reference_cache():
+        models.clear_reference_cache()
+        yield
+        models.clear_reference_cache()
+
+    def describe_resolve_registration_status():
+        def it_creates_districts_in_bulk(
+            expect, db, data, reference_cache, django_assert_max_num_queries
+        ):
+            with django_assert_max_num_queries(12):
+                status = models.Voter.resolve_registration_status(data)
+
+            expect([repr(district) for district in status.districts]) == [
+                "<District: Kent (County)>",
+                "<District: City of Grand Rapids (Jurisdiction)>",
+                "<District: Grand Rapids Public Schools (School District)>",
+            ]
+            expect(str(status.precinct.county)) == "Kent"
+
+        def it_reuses_known_districts(
+            expect, db, data, reference_cache, django_assert_num_queries
+        ):
+            models.Voter.resolve_registration_status(data)
+
+            with django_assert_num_queries(2):
+                status = models.Voter.resolve_registration_status(data)
+
+            expect(status.precinct.ward) == "2"
+
+        def it_keeps_cached_precinct_responses(expect, db, data, reference_cache):
+            status = models.Voter.resolve_registration_status(data)
+            version = versions.get_data_version(models.Precinct)
+
+            status.precinct.set_districts(status.districts[:1])
+
+            expect(versions.get_data_version(models.Precinct)) == version
+
+        def it_replaces_stale_districts(expect, db, data, reference_cache):
+            status = models.Voter.resolve_registration_status(data)
+            (stale,) = models.District.resolve([("State House", "75th District")])
+            status.precinct.districts.add(stale)
+
+            status = models.Voter.resolve_registration_status(data)
+
+            expect(status.districts).excludes(stale)
+            expect(list(status.precinct.districts.all())).excludes(stale)
+
+    def describe_fetch_registration_status():
+        @pytest.fixture
+        def lookups(monkeypatch, data):
+            lookups = []
+
+            def fetch_registration_status_data(voter):
+                lookups.append(voter)
+                return data
+
+            monkeypatch.setattr(
+                helpers,
+                'fetch_registration_status_data',
+                fetch_registration_status_data,
+            )
+            return lookups
+
+        def with_cached_precinct(
+            expect, db, voter, lookups, reference_cache, django_assert_num_queries
+        ):
+            cache.delete(helpers.get_registration_key(voter))
+            status = voter.fetch_registration_status()
+
+            with django_assert_num_queries(2):
+                cached_status = voter.fetch_registration_status()
+
+            expect(len(lookups)) == 1
+            expect(cached_status.precinct) == status.precinct
+            expect(cached_status.districts) == status.districts
+
+        def without_recorded_districts(expect, db, voter, lookups, reference_cache):
+            cache.delete(helpers.get_registration_key(voter))
+            status = voter.fetch_registration_status()
+            status.precinct.districts.clear()
+
+            voter.fetch_registration_status()
+
+            expect(len(lookups)) == 2
+            expect(status.precinct.districts.count()) == 3
+
+
 def describe_district_category():
     def describe_str():
         def it_includes_the_name(expect, district_category):
@@ -87,12 +193,64 @@ def describe_district():
         def it_includes_the_name(expect, district):
             expect(str(district)) == "Kent"
 
+    def describe_resolve():
+        @pytest.fixture
+        def pairs():
+            models.clear_reference_cache()
+            yield [("County", "Kent")]
+            models.clear_reference_cache()
+
+        def it_invalidates_cached_responses(expect, db, pairs):
+            version = versions.get_data_version(models.District)
+
+            models.District.resolve(pairs)
+
+            expect(versions.get_data_version(models.District)) != version
+
+        def it_reuses_its_own_inserts(expect, db, pairs, django_assert_num_queries):
+            models.District.resolve(pairs)
+
+            with django_assert_num_queries(0):
+                models.District.resolve(pairs)
+
+        def it_reloads_after_other_processes_change_districts(
+            expect, db, pairs, django_assert_num_queries
+        ):
+            models.District.resolve(pairs)
+            versions.bump_data_version(models.District)
+
+            with django_assert_num_queries(1):
+                models.District.resolve(pairs)
+
+        def it_survives_the_cache_being_cleared_during_queries(
+            expect, db, pairs, monkeypatch
+        ):
+            load = models.District._load
+
+            def _load_then_clear(pairs):
+                loaded = load(pairs)
+                models.clear_reference_cache()
+                return loaded
+
+            monkeypatch.setattr(models.District, '_load', _load_then_clear)
+
+            (district,) = models.District.resolve(pairs)
+
+            expect(district.name) == "Kent"
+
 
 def describe_election():
     def describe_str():
         def it_includes_the_date(expect, election):
             expect(str(election)) == "State Primary | Tuesday, August 7, 2018"
 
+    def describe_kind():
+        def it_is_parsed_from_the_name(expect, election):
+            expect(election.kind) == 'primary'
+
+        def it_defaults_to_general(expect):
+            expect(models.Election(name="State General").kind) == 'general'
+
 
 def describe_precinct():
     def describe_str():
@@ -121,6 +279,50 @@ def describe_ballot_website():
                 website.mi_sos_url
             ) == "https://mvic.sos.state.mi.us/Voter/GetMvicBallot/1828/676/"
 
+    def describe_handle_html_element():
+        @pytest.fixture
+        def table():
+            html = '<table class="generalTable"><tr><td class="continuation">'
+            html += 'Continued</td></tr></table>'
+            return BeautifulSoup(html, 'html.parser').table
+
+        def _handle(table, name="State General"):
+            election = models.Election(name=name)
+            return models.BallotWebsite._handle_html_element(  # pylint: disable=protected-access
+                table, election=election, precinct=None, district=None, party=None
+            )
+
+        def it_can_profile_each_handler(expect, table):
+            with metrics.profile_parsers() as profile:
+                expect(_handle(table)) == True
+
+            expect(list(profile.handlers)) == ['general.handle_general_wrapper']
+            wrapper = profile.handlers['general.handle_general_wrapper']
+            expect((wrapper.calls, wrapper.matches, wrapper.queries)) == (1, 1, 0)
+            expect(profile.attempts) == {1: 1}
+            expect(profile.report()).contains('1: 1')
+
+        def it_is_disabled_by_default(expect, table):
+            expect(_handle(table)) == True
+
+            expect(metrics.parser_profile) == None
+
+        def it_parses_primaries_with_the_general_handlers(expect, table):
+            with metrics.profile_parsers() as profile:
+                expect(_handle(table, name="State Primary")) == True
+
+            expect(list(profile.handlers)) == ['general.handle_general_wrapper']
+
+        def it_can_parse_primaries_with_the_primary_handlers(expect, settings):
+            settings.PRIMARY_BALLOT_PARSER = 'primary'
+            html = '<table><tr><td class="primarySection">PARTISAN SECTION'
+            table = BeautifulSoup(html, 'html.parser').table
+
+            with metrics.profile_parsers() as profile:
+                expect(_handle(table, name="State Primary")) == True
+
+            expect(list(profile.handlers)) == ['primary.handle_header']
+
 
 def describe_ballot():
     def describe_str():
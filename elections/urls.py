@@ -30,4 +30,6 @@ router.register('parties', views.PartyViewSet)
 router.register('candidates', views.CandidateViewSet)
 router.register('positions', views.PositionViewSet)
 
+router.register('search', views.SearchViewSet, base_name='search')
+
 urlpatterns = router.urls
@@ -0,0 +1,39 @@
+# pylint: disable=protected-access
+
+import hashlib
+import uuid
+from typing import Optional, Type
+
+from django.core.cache import cache
+from django.db.models import Model
+
+
+def get_key(model: Type[Model]) -> str:
+    return f'elections:version:{model._meta.label_lower}'
+
+
+def get_data_version(*model_classes: Type[Model]) -> str:
+    """Combine the current versions of the data behind a response."""
+    keys = [get_key(model) for model in model_classes]
+    versions = cache.get_many(keys)
+
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+
+    return '.'.join(versions[key] for key in keys)
+
+
+def bump_data_version(*model_classes: Type[Model]):
+    """Invalidate cached responses built from these models."""
+    cache.set_many({get_key(model): uuid.uuid4().hex for model in model_classes}, None)
+
+
+def build_etag(request, version: str) -> Optional[str]:
+    if request.method not in {'GET', 'HEAD'}:
+        return None
+
+    accept = request.META.get('HTTP_ACCEPT', '')
+    value = f'{version}|{request.get_full_path()}|{accept}'
+    return hashlib.sha1(value.encode()).hexdigest()
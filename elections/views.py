@@ -1,16 +1,122 @@
-from django.utils.decorators import method_decorator
+from typing import Dict, List, Optional, Type
+
+from django.conf import settings
+from django.db.models import Model
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
+import bugsnag
+import log
 from rest_framework import generics, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, NotFound, ValidationError
 from rest_framework.response import Response
 
-from . import filters, models, serializers
+from . import (
+    boundaries,
+    exports,
+    filters,
+    helpers,
+    metrics,
+    models,
+    search,
+    serializers,
+    versions,
+    vip,
+)
 
 
 class CacheMixin:
-    @method_decorator(cache_page(60 * 60))
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)  # type: ignore
+    etag_models: List[Type[Model]] = []
+
+    def dispatch(self, request, *args, **kwargs):
+        # Clients holding the current ETag are answered before any queries run
+        version = versions.get_data_version(*self.etag_models)
+        etag = versions.build_etag(request, version)
+
+        dispatch = super().dispatch  # type: ignore
+        dispatch = cache_page(60 * 60, key_prefix=version)(dispatch)
+        dispatch = condition(etag_func=lambda *_args, **_kwargs: etag)(dispatch)
+        response = dispatch(request, *args, **kwargs)
+
+        # Read by the metrics middleware; cache_page flags misses to store them
+        if response.status_code == 304:
+            request.cache_hit = True
+        elif request.method in {'GET', 'HEAD'}:
+            request.cache_hit = not getattr(request, '_cache_update_cache', False)
+        return response
+
+
+class RelatedFieldsMixin:
+    related_fields: Dict[str, List[str]] = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()  # type: ignore
+        sparse = serializers.get_sparse_fields(self.request)  # type: ignore
+        if sparse is None:
+            return queryset
+        names, expand = sparse
+
+        # Only join the relations needed by the requested representation
+        queryset = queryset.select_related(None).prefetch_related(None)
+        serializer_class = self.get_serializer_class()  # type: ignore
+        expandable = getattr(serializer_class.Meta, 'expandable_fields', [])
+        for name, lookups in self.related_fields.items():
+            if names is not None and name not in names:
+                continue
+            collapsed = name in expandable and expand is not None and name not in expand
+            for lookup in lookups:
+                relation = lookup.split('__')[0]
+                field = queryset.model._meta.get_field(  # pylint: disable=protected-access
+                    relation
+                )
+                if field.one_to_many or field.many_to_many:
+                    queryset = queryset.prefetch_related(
+                        relation if collapsed else lookup
+                    )
+                elif not collapsed:
+                    queryset = queryset.select_related(lookup)
+
+        return queryset
+
+
+class ValuesListMixin:
+    values_serializer_class: Optional[Type[serializers.ValuesSerializer]] = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())  # type: ignore
+
+        # Format suffixes change every hyperlink and sparse fields skip joins,
+        # so both are handled by the full serializers
+        if (
+            not self.values_serializer_class
+            or self.format_kwarg  # type: ignore
+            or serializers.get_sparse_fields(request) is not None
+        ):
+            page = self.paginate_queryset(queryset)  # type: ignore
+            with metrics.serializing(request):
+                data = self.get_serializer(  # type: ignore
+                    queryset if page is None else page, many=True
+                ).data
+        else:
+            serializer = self.values_serializer_class(request)
+            queryset = serializer.get_queryset(queryset)
+            page = self.paginate_queryset(queryset)  # type: ignore
+            rows = list(queryset) if page is None else page
+            with metrics.serializing(request):
+                data = serializer.to_representation(rows)
+
+        if page is not None:
+            return self.get_paginated_response(data)  # type: ignore
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()  # type: ignore
+        with metrics.serializing(request):
+            data = self.get_serializer(instance).data  # type: ignore
+        return Response(data)
 
 
 class RegistrationViewSet(viewsets.ViewSetMixin, generics.ListAPIView):
@@ -36,9 +142,96 @@ class RegistrationViewSet(viewsets.ViewSetMixin, generics.ListAPIView):
         )
         return Response(output_serializer.data)
 
-    @method_decorator(cache_page(60 * 30))
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    @action(detail=False, methods=['post'], renderer_classes=[exports.NDJSONRenderer])
+    def batch(self, request):
+        """
+        Check a list of voters' registrations, streaming each result as newline-delimited JSON when its lookup completes.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError(
+                f"Expected a list of voters but got {type(request.data).__name__}."
+            )
+        if len(request.data) > settings.MI_SOS_BATCH_LIMIT:
+            raise ValidationError(
+                f"Batches are limited to {settings.MI_SOS_BATCH_LIMIT} voters."
+            )
+        input_serializer = serializers.VoterSerializer(data=request.data, many=True)
+        input_serializer.is_valid(raise_exception=True)
+        voters = [models.Voter(**data) for data in input_serializer.validated_data]
+
+        renderer = request.accepted_renderer
+        return StreamingHttpResponse(
+            self._iter_batch(request, voters),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+
+    def _iter_batch(self, request, voters):
+        indexes: Dict[tuple, List[int]] = {}
+        unique_voters = []
+        for index, voter in enumerate(voters):
+            if voter.identity not in indexes:
+                indexes[voter.identity] = []
+                unique_voters.append(voter)
+            indexes[voter.identity].append(index)
+
+        # Each voter's failure becomes its own error line, since the response
+        # status has already been sent once streaming starts
+        pending_voters = []
+        for voter in unique_voters:
+            try:
+                registration_status = voter.get_cached_registration_status()
+                if registration_status is None:
+                    pending_voters.append(voter)
+                    continue
+                result = self._serialize_status(request, registration_status)
+            except Exception as e:  # pylint: disable=broad-except
+                result = {'error': self._describe_error(e)}
+
+            for index in indexes[voter.identity]:
+                yield request.accepted_renderer.render({'index': index, **result})
+
+        lookups = helpers.fetch_registration_status_data_concurrently(pending_voters)
+        for voter, data, error in lookups:
+            if not error:
+                try:
+                    registration_status = voter.resolve_registration_status(data)
+                    voter.cache_registration_status(data, registration_status)
+                    result = self._serialize_status(request, registration_status)
+                except Exception as e:  # pylint: disable=broad-except
+                    error = e
+            if error:
+                result = {'error': self._describe_error(error)}
+
+            for index in indexes[voter.identity]:
+                yield request.accepted_renderer.render({'index': index, **result})
+
+    @staticmethod
+    def _serialize_status(request, registration_status):
+        return serializers.RegistrationStatusSerializer(
+            registration_status, context={'request': request}
+        ).data
+
+    @staticmethod
+    def _describe_error(error: BaseException) -> str:
+        if isinstance(error, APIException):
+            return str(error.detail)
+        log.error(f"Registration lookup failed: {error!r}")
+        if not settings.DEBUG:
+            bugsnag.notify(error)
+        return "Unable to determine registration status."
+
+
+EXPORT_MODELS = [
+    models.Election,
+    models.Ballot,
+    models.Precinct,
+    models.District,
+    models.DistrictCategory,
+    models.Position,
+    models.Candidate,
+    models.Party,
+    models.Proposal,
+]
 
 
 class ElectionViewSet(CacheMixin, viewsets.ModelViewSet):
@@ -54,10 +247,42 @@ class ElectionViewSet(CacheMixin, viewsets.ModelViewSet):
 
     http_method_names = ['options', 'get']
     queryset = models.Election.objects.all()
+    etag_models = [models.Election]
     filter_backends = [filters.DjangoFilterBackend]
     filter_class = filters.ElectionFilter
     serializer_class = serializers.ElectionSerializer
 
+    @action(
+        detail=True,
+        renderer_classes=[exports.NDJSONRenderer, exports.CSVRenderer],
+        etag_models=EXPORT_MODELS,
+    )
+    def export(self, request, pk=None):  # pylint: disable=unused-argument
+        """
+        Stream every precinct, position, candidate, and proposal in an election as NDJSON or CSV.
+        """
+        return self._stream(request, 'election')
+
+    @action(detail=True, renderer_classes=[vip.VIPRenderer], etag_models=EXPORT_MODELS)
+    def vip(self, request, pk=None):  # pylint: disable=unused-argument
+        """
+        Stream an election as a [VIP 5.1](https://vip-specification.readthedocs.io/en/vip52/) XML feed.
+        """
+        return self._stream(request, 'vipFeed')
+
+    def _stream(self, request, name):
+        election = self.get_object()
+        renderer = request.accepted_renderer
+
+        response = StreamingHttpResponse(
+            renderer.stream(election),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        filename = f'{name}-{election.id}.{renderer.format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        patch_cache_control(response, public=True, max_age=60 * 60)
+        return response
+
 
 class DistrictCategoryViewSet(CacheMixin, viewsets.ModelViewSet):
     """
@@ -72,10 +297,11 @@ class DistrictCategoryViewSet(CacheMixin, viewsets.ModelViewSet):
 
     http_method_names = ['options', 'get']
     queryset = models.DistrictCategory.objects.all()
+    etag_models = [models.DistrictCategory]
     serializer_class = serializers.DistrictCategorySerializer
 
 
-class DistrictViewSet(CacheMixin, viewsets.ModelViewSet):
+class DistrictViewSet(CacheMixin, RelatedFieldsMixin, viewsets.ModelViewSet):
     """
     [VIP 5.1.2: Locality](https://vip-specification.readthedocs.io/en/vip52/built_rst/xml/elements/locality.html)
 
@@ -88,10 +314,14 @@ class DistrictViewSet(CacheMixin, viewsets.ModelViewSet):
 
     http_method_names = ['options', 'get']
     queryset = models.District.objects.all().prefetch_related('category')
+    etag_models = [models.District, models.DistrictCategory]
+    related_fields = {'category': ['category']}
     serializer_class = serializers.DistrictSerializer
 
 
-class PrecinctViewSet(CacheMixin, viewsets.ModelViewSet):
+class PrecinctViewSet(
+    CacheMixin, RelatedFieldsMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     [VIP 5.1.2: Precinct](https://vip-specification.readthedocs.io/en/vip52/built_rst/xml/elements/precinct.html)
 
@@ -104,12 +334,48 @@ class PrecinctViewSet(CacheMixin, viewsets.ModelViewSet):
 
     http_method_names = ['options', 'get']
     queryset = models.Precinct.objects.select_related('county', 'jurisdiction').all()
+    etag_models = [models.Precinct, models.District]
     filter_backends = [filters.DjangoFilterBackend]
     filter_class = filters.PrecinctFilter
+    related_fields = {'county': ['county'], 'jurisdiction': ['jurisdiction']}
     serializer_class = serializers.PrecinctSerializer
-
-
-class BallotViewSet(CacheMixin, viewsets.ModelViewSet):
+    values_serializer_class = serializers.PrecinctValuesSerializer
+
+    @action(detail=False)
+    def locate(self, request):
+        """
+        Return the precinct containing a point, such as a geocoded home address.
+        """
+        coordinates = {}
+        for name, limit in [('latitude', 90), ('longitude', 180)]:
+            try:
+                value = float(request.query_params[name])
+            except KeyError:
+                raise ValidationError({name: "This field is required."}) from None
+            except ValueError:
+                raise ValidationError({name: "A valid number is required."}) from None
+            if not -limit <= value <= limit:
+                raise ValidationError(
+                    {name: f"Ensure this value is between -{limit} and {limit}."}
+                )
+            coordinates[name] = value
+
+        precinct_id = boundaries.locate(**coordinates)
+        if precinct_id is None:
+            raise NotFound("No precinct contains this location.")
+
+        # The index can lag behind a precinct deleted by another process
+        precinct = self.get_queryset().filter(id=precinct_id).first()
+        if precinct is None:
+            raise NotFound("No precinct contains this location.")
+
+        serializer = self.get_serializer(precinct)
+        return Response(serializer.data)
+
+
+class BallotViewSet(
+    CacheMixin, RelatedFieldsMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     [VIP 5.1.2: BallotStyle](https://vip-specification.readthedocs.io/en/vip52/built_rst/xml/elements/ballot_style.html)
 
@@ -124,12 +390,21 @@ class BallotViewSet(CacheMixin, viewsets.ModelViewSet):
     queryset = models.Ballot.objects.select_related(
         'election', 'precinct', 'precinct__county', 'precinct__jurisdiction'
     ).all()
+    etag_models = [models.Ballot, models.Election, models.Precinct, models.District]
     filter_backends = [filters.DjangoFilterBackend]
     filter_class = filters.BallotFilter
+    related_fields = {
+        'election': ['election'],
+        'precinct': ['precinct__county', 'precinct__jurisdiction'],
+        'mi_sos_url': ['election', 'precinct'],
+    }
     serializer_class = serializers.BallotSerializer
+    values_serializer_class = serializers.BallotValuesSerializer
 
 
-class ProposalViewSet(CacheMixin, viewsets.ModelViewSet):
+class ProposalViewSet(
+    CacheMixin, RelatedFieldsMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     [VIP 5.1.2: BallotMeasureContest](https://vip-specification.readthedocs.io/en/vip52/built_rst/xml/elements/ballot_measure_contest.html)
 
@@ -141,12 +416,19 @@ class ProposalViewSet(CacheMixin, viewsets.ModelViewSet):
     """
 
     http_method_names = ['get']
-    queryset = models.Proposal.objects.select_related(
-        'election', 'district__category'
-    ).distinct()
+    queryset = models.Proposal.objects.select_related('election', 'district__category')
+    etag_models = [
+        models.Proposal,
+        models.Election,
+        models.District,
+        models.DistrictCategory,
+        models.Precinct,
+    ]
     filter_backends = [filters.DjangoFilterBackend]
     filter_class = filters.ProposalFilter
+    related_fields = {'election': ['election'], 'district': ['district__category']}
     serializer_class = serializers.ProposalSerializer
+    values_serializer_class = serializers.ProposalValuesSerializer
 
 
 class PartyViewSet(CacheMixin, viewsets.ModelViewSet):
@@ -162,10 +444,13 @@ class PartyViewSet(CacheMixin, viewsets.ModelViewSet):
 
     http_method_names = ['get']
     queryset = models.Party.objects.all()
+    etag_models = [models.Party]
     serializer_class = serializers.PartySerializer
 
 
-class CandidateViewSet(CacheMixin, viewsets.ModelViewSet):
+class CandidateViewSet(
+    CacheMixin, RelatedFieldsMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     [VIP 5.1.2: Candidate](https://vip-specification.readthedocs.io/en/vip52/built_rst/xml/elements/candidate.html)
 
@@ -178,13 +463,24 @@ class CandidateViewSet(CacheMixin, viewsets.ModelViewSet):
 
     http_method_names = ['get']
     queryset = models.Candidate.objects.select_related('position', 'party').all()
-    # TODO: Add support for filtering candidates
-    # filter_backends = [filters.DjangoFilterBackend]
-    # filter_class = filters.CandidateFilter
+    etag_models = [
+        models.Candidate,
+        models.Party,
+        models.Position,
+        models.Election,
+        models.District,
+        models.Precinct,
+    ]
+    filter_backends = [filters.DjangoFilterBackend]
+    filter_class = filters.CandidateFilter
+    related_fields = {'party': ['party']}
     serializer_class = serializers.CandidateSerializer
+    values_serializer_class = serializers.CandidateValuesSerializer
 
 
-class PositionViewSet(CacheMixin, viewsets.ModelViewSet):
+class PositionViewSet(
+    CacheMixin, RelatedFieldsMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     [VIP 5.1.2: CandidateContest](https://vip-specification.readthedocs.io/en/vip52/built_rst/xml/elements/candidate_contest.html)
 
@@ -196,11 +492,56 @@ class PositionViewSet(CacheMixin, viewsets.ModelViewSet):
     """
 
     http_method_names = ['get']
-    queryset = (
-        models.Position.objects.select_related('election', 'district__category')
-        .prefetch_related('candidates__party')
-        .distinct()
-    )
+    queryset = models.Position.objects.select_related(
+        'election', 'district__category'
+    ).prefetch_related('candidates__party')
+    etag_models = [
+        models.Position,
+        models.Candidate,
+        models.Party,
+        models.Election,
+        models.District,
+        models.DistrictCategory,
+        models.Precinct,
+    ]
     filter_backends = [filters.DjangoFilterBackend]
     filter_class = filters.PositionFilter
+    related_fields = {
+        'candidates': ['candidates__party'],
+        'election': ['election'],
+        'district': ['district__category'],
+    }
     serializer_class = serializers.PositionSerializer
+    values_serializer_class = serializers.PositionValuesSerializer
+
+
+class SearchViewSet(CacheMixin, viewsets.ViewSet):
+    """
+    list:
+    Return candidates, positions, and proposals matching a query, best matches first.
+    """
+
+    etag_models = [models.Candidate, models.Position, models.Proposal]
+
+    def list(self, request):
+        text = request.query_params.get('q', '').strip()
+        if len(text) < 2:
+            raise ValidationError({'q': "Search for at least 2 characters."})
+
+        try:
+            election_id = int(request.query_params['election_id'])
+        except KeyError:
+            election_id = None
+        except ValueError:
+            raise ValidationError(
+                {'election_id': "A valid integer is required."}
+            ) from None
+
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            raise ValidationError({'limit': "A valid integer is required."}) from None
+
+        rows = search.search(text, election_id=election_id, limit=max(limit, 1))
+        serializer = serializers.SearchResultValuesSerializer(request)
+        return Response(serializer.to_representation(rows))
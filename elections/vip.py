@@ -0,0 +1,319 @@
+"""Voting Information Project 5.1 feeds.
+
+https://vip-specification.readthedocs.io/en/vip52/built_rst/xml/index.html
+"""
+
+import heapq
+import itertools
+from datetime import datetime
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+
+from django.db.models import Max, Q
+
+from rest_framework import renderers
+
+from .exports import CHUNK_SIZE, join_chunks
+from .models import (
+    Ballot,
+    Candidate,
+    District,
+    DistrictCategory,
+    Election,
+    Party,
+    Position,
+    Precinct,
+    Proposal,
+)
+
+
+STATE_ID = 'st26'
+
+DISTRICT_TYPES = {
+    "State": 'state',
+    "County": 'county',
+    "Jurisdiction": 'municipality',
+    "City": 'city',
+    "Township": 'township',
+    "Village": 'village',
+    "US Congress": 'congressional',
+    "State House": 'state-house',
+    "State Senate": 'state-senate',
+    "School": 'school',
+    "Local School": 'school',
+    "Intermediate School": 'school',
+    "Community College": 'school',
+    "Circuit Court": 'judicial',
+    "Court of Appeals": 'judicial',
+    "District Court": 'judicial',
+    "Municipal Court": 'judicial',
+    "Probate Court": 'judicial',
+    "Probate District Court": 'judicial',
+}
+
+
+def iter_feed(election: Election) -> Iterator[str]:
+    """Yield a VIP feed for an election in constant memory."""
+    lines = itertools.chain(
+        iter_header(election),
+        iter_parties(),
+        iter_districts(election),
+        iter_precincts(election),
+        iter_positions(election),
+        iter_proposals(election),
+        ['</VipObject>\n'],
+    )
+    return join_chunks(lines)
+
+
+def element(tag: str, content, **attributes) -> str:
+    attrs = ''.join(f' {key}="{value}"' for key, value in attributes.items())
+    return f'<{tag}{attrs}>{content}</{tag}>'
+
+
+def text(tag: str, value: str) -> str:
+    return element(tag, element('Text', escape(value), language='en'))
+
+
+def optional(tag: str, value) -> str:
+    return element(tag, escape(str(value))) if value else ''
+
+
+class Children:
+    """Pair rows sorted by a parent ID with parents iterated in the same order."""
+
+    def __init__(self, rows: Iterable[Tuple]):
+        self.rows = iter(rows)
+        self.pending = next(self.rows, None)
+
+    def take(self, parent_id: int) -> List[Tuple]:
+        children = []
+        while self.pending and self.pending[0] <= parent_id:
+            if self.pending[0] == parent_id:
+                children.append(self.pending[1:])
+            self.pending = next(self.rows, None)
+        return children
+
+
+def iter_header(election: Election) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield (
+        '<VipObject xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+        ' xsi:noNamespaceSchemaLocation="https://raw.githubusercontent.com/'
+        'votinginfoproject/vip-specification/vip52/vip_spec.xsd"'
+        ' schemaVersion="5.1">\n'
+    )
+    yield element(
+        'Source',
+        element('DateTime', get_last_modified(election).isoformat(timespec='seconds'))
+        + element('Name', "Michigan Elections API")
+        + element('VipId', STATE_ID[2:]),
+        id='src1',
+    ) + '\n'
+    yield element('State', element('Name', "Michigan"), id=STATE_ID) + '\n'
+    yield element(
+        'Election',
+        element('Date', election.date.isoformat())
+        + element('IsStatewide', 'true')
+        + text('Name', election.name)
+        + element('StateId', STATE_ID),
+        id=f'ele{election.id}',
+    ) + '\n'
+
+
+def get_last_modified(election: Election) -> datetime:
+    """Date the feed by its data, so the same ETag always serves the same bytes."""
+    querysets = [
+        Election.objects.filter(id=election.id),
+        Ballot.objects.filter(election=election),
+        Precinct.objects.filter(ballot__election=election),
+        District.objects.all(),
+        DistrictCategory.objects.all(),
+        Party.objects.all(),
+        Position.objects.filter(election=election),
+        Candidate.objects.filter(position__election=election),
+        Proposal.objects.filter(election=election),
+    ]
+    dates = [
+        queryset.aggregate(Max('modified'))['modified__max'] for queryset in querysets
+    ]
+    return max(date for date in dates if date)
+
+
+def iter_parties() -> Iterator[str]:
+    rows = Party.objects.order_by('id').values_list('id', 'name', 'color')
+    for pk, name, color in rows:
+        yield element(
+            'Party',
+            optional('Color', format_color(color)) + text('Name', name),
+            id=f'par{pk}',
+        ) + '\n'
+
+
+def format_color(color: str) -> str:
+    color = color.lstrip('#').lower()
+    if len(color) == 3:
+        color = ''.join(c * 2 for c in color)
+    return color
+
+
+def iter_districts(election: Election) -> Iterator[str]:
+    precincts = Precinct.objects.filter(ballot__election=election)
+
+    districts = District.objects.filter(
+        Q(id__in=precincts.values('county'))
+        | Q(id__in=precincts.values('jurisdiction'))
+        | Q(id__in=Position.objects.filter(election=election).values('district'))
+        | Q(id__in=Proposal.objects.filter(election=election).values('district'))
+    )
+    rows = districts.order_by('id').values_list('id', 'name', 'category__name')
+    for pk, name, category in rows.iterator(chunk_size=CHUNK_SIZE):
+        kind = DISTRICT_TYPES.get(category, 'other')
+        content = element('Name', escape(name))
+        if kind == 'other':
+            content += element('OtherType', escape(category))
+        content += element('Type', kind)
+        yield element('ElectoralDistrict', content, id=f'ed{pk}') + '\n'
+
+    localities = District.objects.filter(id__in=precincts.values('jurisdiction'))
+    rows = localities.order_by('id').values_list('id', 'name')
+    for pk, name in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield element(
+            'Locality',
+            element('ElectoralDistrictIds', f'ed{pk}')
+            + element('Name', escape(name))
+            + element('StateId', STATE_ID),
+            id=f'loc{pk}',
+        ) + '\n'
+
+
+def iter_precincts(election: Election) -> Iterator[str]:
+    position_links = (
+        Position.precincts.through.objects.filter(position__election=election)
+        .order_by('precinct', 'position')
+        .values_list('precinct', 'position')
+    )
+    proposal_links = (
+        Proposal.precincts.through.objects.filter(proposal__election=election)
+        .order_by('precinct', 'proposal')
+        .values_list('precinct', 'proposal')
+    )
+    # Merging is stable, so positions stay ahead of proposals on each ballot
+    contests = Children(
+        heapq.merge(
+            ((precinct, f'occ{pk}') for precinct, pk in position_links.iterator()),
+            ((precinct, f'obmc{pk}') for precinct, pk in proposal_links.iterator()),
+            key=itemgetter(0),
+        )
+    )
+
+    rows = (
+        Precinct.objects.filter(ballot__election=election)
+        .order_by('id')
+        .values_list(
+            'id', 'county', 'jurisdiction', 'jurisdiction__name', 'ward', 'number'
+        )
+    )
+    for pk, county, jurisdiction, jurisdiction_name, ward, number in rows.iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        name = jurisdiction_name
+        if ward:
+            name += f' Ward {ward}'
+        if number:
+            name += f' Precinct {number}'
+
+        yield element(
+            'Precinct',
+            element('BallotStyleId', f'bs{pk}')
+            + element('ElectoralDistrictIds', f'ed{county} ed{jurisdiction}')
+            + element('LocalityId', f'loc{jurisdiction}')
+            + element('Name', escape(name))
+            + optional('Number', number)
+            + optional('Ward', ward),
+            id=f'pre{pk}',
+        ) + '\n'
+
+        contest_ids = ' '.join(row[0] for row in contests.take(pk))
+        yield element(
+            'BallotStyle', optional('OrderedContestIds', contest_ids), id=f'bs{pk}'
+        ) + '\n'
+
+
+def iter_positions(election: Election) -> Iterator[str]:
+    candidates = Children(
+        Candidate.objects.filter(position__election=election)
+        .order_by('position', 'name')
+        .values_list('position', 'id', 'name', 'party')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    rows = (
+        Position.objects.filter(election=election)
+        .order_by('id')
+        .values_list('id', 'name', 'term', 'seats', 'district')
+    )
+    for pk, name, term, seats, district in rows.iterator(chunk_size=CHUNK_SIZE):
+        selections = candidates.take(pk)
+        selection_ids = ' '.join(f'cs{row[0]}' for row in selections)
+
+        yield element(
+            'CandidateContest',
+            optional('BallotSelectionIds', selection_ids)
+            + (text('BallotSubTitle', term) if term else '')
+            + optional('ElectoralDistrictId', district and f'ed{district}')
+            + element('Name', escape(name))
+            + element('NumberElected', seats)
+            + element('VotesAllowed', seats),
+            id=f'cc{pk}',
+        ) + '\n'
+        yield element(
+            'OrderedContest',
+            element('ContestId', f'cc{pk}')
+            + optional('OrderedBallotSelectionIds', selection_ids),
+            id=f'occ{pk}',
+        ) + '\n'
+
+        for candidate_id, candidate_name, party in selections:
+            yield element(
+                'Candidate',
+                text('BallotName', candidate_name)
+                + optional('PartyId', party and f'par{party}'),
+                id=f'can{candidate_id}',
+            ) + '\n'
+            yield element(
+                'CandidateSelection',
+                element('CandidateIds', f'can{candidate_id}'),
+                id=f'cs{candidate_id}',
+            ) + '\n'
+
+
+def iter_proposals(election: Election) -> Iterator[str]:
+    rows = (
+        Proposal.objects.filter(election=election)
+        .order_by('id')
+        .values_list('id', 'name', 'description', 'district')
+    )
+    for pk, name, description, district in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield element(
+            'BallotMeasureContest',
+            optional('ElectoralDistrictId', district and f'ed{district}')
+            + element('Name', escape(name))
+            + text('FullText', description),
+            id=f'bmc{pk}',
+        ) + '\n'
+        yield element(
+            'OrderedContest', element('ContestId', f'bmc{pk}'), id=f'obmc{pk}'
+        ) + '\n'
+
+
+class VIPRenderer(renderers.BaseRenderer):
+    media_type = 'application/xml'
+    format = 'xml'
+    charset = 'utf-8'
+
+    stream = staticmethod(iter_feed)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return element('Error', escape(str(data)))
@@ -3,6 +3,8 @@ from datetime import timedelta
 import pytest
 import requests_cache
 
+from elections import models
+
 
 class Anything:
     def __eq__(self, other):
@@ -17,3 +19,9 @@ def anything():
 @pytest.fixture(scope='session', autouse=True)
 def cache_requests():
     requests_cache.install_cache(expire_after=timedelta(hours=12))
+
+
+@pytest.fixture(autouse=True)
+def clear_reference_cache():
+    yield
+    models.clear_reference_cache()
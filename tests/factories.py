@@ -7,6 +7,7 @@ from elections import models
 class DistrictCategoryFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = models.DistrictCategory
+        django_get_or_create = ['name']
 
 
 class CountyFactory(factory.django.DjangoModelFactory):
@@ -50,3 +51,49 @@ class BallotFactory(factory.django.DjangoModelFactory):
 
     election = factory.SubFactory(ElectionFactory)
     precinct = factory.SubFactory(PrecinctFactory)
+
+
+class DistrictFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = models.District
+
+    category = factory.SubFactory(DistrictCategoryFactory, name="State House")
+    name = factory.Sequence(lambda n: f"{n + 1}th District")
+
+
+class PartyFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = models.Party
+
+    name = factory.Sequence(lambda n: f"Party {n + 1}")
+    color = '#3333FF'
+
+
+class ProposalFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = models.Proposal
+
+    election = factory.SubFactory(ElectionFactory)
+    district = factory.SubFactory(DistrictFactory)
+    name = factory.Sequence(lambda n: f"Proposal {n + 1}")
+    description = "Shall the millage be renewed?"
+
+
+class PositionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = models.Position
+
+    election = factory.SubFactory(ElectionFactory)
+    district = factory.SubFactory(DistrictFactory)
+    name = factory.Sequence(lambda n: f"Position {n + 1}")
+    term = "4 Year Term"
+    seats = 1
+
+
+class CandidateFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = models.Candidate
+
+    position = factory.SubFactory(PositionFactory)
+    party = factory.SubFactory(PartyFactory)
+    name = factory.Sequence(lambda n: f"Candidate {n + 1}")
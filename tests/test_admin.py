@@ -0,0 +1,111 @@
+# pylint: disable=unused-argument,unused-variable
+
+import pytest
+
+from elections import models
+from elections.admin import EstimatedCountPaginator
+
+from . import factories
+
+
+def describe_ballot_websites():
+    @pytest.fixture
+    def url():
+        return '/admin/elections/ballotwebsite/?fetched__exact=1'
+
+    @pytest.fixture
+    def websites(db):
+        county = factories.CountyFactory(name="Kent")
+        jurisdiction = factories.JurisdictionFactory(name="City of Grand Rapids")
+        election = factories.ElectionFactory()
+        websites = []
+        for index in range(5):
+            precinct = factories.PrecinctFactory(
+                county=county, jurisdiction=jurisdiction, mi_sos_id=index + 1
+            )
+            websites.append(
+                models.BallotWebsite.objects.create(
+                    ballot=factories.BallotFactory(
+                        election=election, precinct=precinct
+                    ),
+                    mi_sos_election_id=election.mi_sos_id,
+                    mi_sos_precinct_id=index + 1,
+                    mi_sos_html="<html>Kent County, Michigan</html>",
+                    fetched=True,
+                )
+            )
+        return websites
+
+    def it_does_not_query_per_row(
+        expect, admin_client, django_assert_max_num_queries, url, websites
+    ):
+        with django_assert_max_num_queries(5):
+            response = admin_client.get(url)
+
+        expect(response.status_code) == 200
+        expect(len(response.context['cl'].result_list)) == 5
+
+    def it_searches_by_exact_precinct_id(expect, admin_client, url, websites):
+        response = admin_client.get(url + '&q=3')
+
+        expect(response.status_code) == 200
+        expect(list(response.context['cl'].result_list)) == [websites[2]]
+
+    def it_searches_by_exact_election_id(expect, admin_client, url, websites):
+        election_id = websites[0].mi_sos_election_id
+
+        response = admin_client.get(url + f'&q={election_id}')
+
+        expect(response.status_code) == 200
+        expect(len(response.context['cl'].result_list)) == 5
+        sql = str(response.context['cl'].queryset.query)
+        expect(sql.upper()).excludes('UPPER(')
+        expect(sql.upper()).excludes('LIKE')
+
+    def it_ignores_text_searches(expect, admin_client, url, websites):
+        response = admin_client.get(url + '&q=Kent')
+
+        expect(response.status_code) == 200
+        expect(list(response.context['cl'].result_list)) == []
+        expect(response.content.decode()).contains("Prefix the query with")
+
+    def it_can_search_html_explicitly(expect, admin_client, url, websites):
+        response = admin_client.get(url + '&q=html:kent county')
+
+        expect(response.status_code) == 200
+        expect(len(response.context['cl'].result_list)) == 5
+
+
+def describe_estimated_count_paginator():
+    def it_counts_small_querysets_exactly(expect, db):
+        county = factories.CountyFactory(name="Kent")
+        jurisdiction = factories.JurisdictionFactory(name="City of Grand Rapids")
+        for number in range(3):
+            factories.PrecinctFactory(
+                county=county,
+                jurisdiction=jurisdiction,
+                mi_sos_id=number + 1,
+                number=str(number),
+            )
+
+        paginator = EstimatedCountPaginator(models.Precinct.objects.all(), 2)
+
+        expect(paginator.count) == 3
+
+
+def describe_candidates():
+    def it_does_not_query_per_row(
+        expect, admin_client, django_assert_max_num_queries, db
+    ):
+        position = factories.PositionFactory()
+        for _ in range(5):
+            factories.CandidateFactory(position=position, party=None)
+
+        with django_assert_max_num_queries(8):
+            response = admin_client.get(
+                f'/admin/elections/candidate/'
+                f'?position__election__id__exact={position.election.id}'
+            )
+
+        expect(response.status_code) == 200
+        expect(len(response.context['cl'].result_list)) == 5
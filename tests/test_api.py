@@ -1,8 +1,16 @@
 # pylint: disable=unused-argument,unused-variable
 
+import json
+import time
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+
 import pendulum
 import pytest
 
+from elections import boundaries, filters, helpers, metrics, models
+
 from . import factories
 
 
@@ -122,6 +130,130 @@ def describe_registrations():
             'districts': [],
         }
 
+    def when_the_circuit_is_open(expect, client, url, db):
+        cache.set('mi_sos:breaker:opened', time.time(), timeout=None)
+        try:
+            response = client.get(
+                url + '?first_name=Jane'
+                '&last_name=Doe'
+                '&birth_date=2000-01-01'
+                '&zip_code=99999'
+            )
+        finally:
+            cache.delete('mi_sos:breaker:opened')
+
+        expect(response.status_code) == 503
+        expect(int(response['Retry-After'])) > 0
+
+    def describe_batch():
+        @pytest.fixture
+        def lookups(monkeypatch):
+            cache.clear()
+            lookups = []
+
+            def fetch_registration_status_data(voter):
+                lookups.append(voter.identity)
+                if voter.last_name == "Bliss":
+                    raise helpers.ServiceUnavailable()
+                return {'registered': False, 'districts': {}}
+
+            monkeypatch.setattr(
+                helpers,
+                'fetch_registration_status_data',
+                fetch_registration_status_data,
+            )
+            yield lookups
+            cache.clear()
+
+        def with_duplicate_identities(expect, client, url, db, lookups):
+            voter = {
+                'first_name': "Jane",
+                'last_name': "Doe",
+                'birth_date': '2000-01-01',
+                'zip_code': '99999',
+            }
+            duplicate = dict(voter, first_name="JANE", birth_date='2000-01-15')
+            unavailable = dict(voter, last_name="Bliss")
+
+            response = client.post(
+                url + 'batch/',
+                [voter, unavailable, duplicate],
+                content_type='application/json',
+            )
+
+            expect(response.status_code) == 200
+            expect(response['Content-Type']) == 'application/x-ndjson; charset=utf-8'
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            rows = sorted(
+                (json.loads(line) for line in lines), key=lambda r: r['index']
+            )
+            expect(rows[0]) == {
+                'index': 0,
+                'registered': False,
+                'precinct': None,
+                'districts': [],
+            }
+            expect(rows[1]) == {
+                'index': 1,
+                'error': helpers.ServiceUnavailable.default_detail,
+            }
+            expect(rows[2]) == dict(rows[0], index=2)
+            expect(len(lookups)) == 2
+
+        def with_invalid_identity(expect, client, url, db, lookups):
+            response = client.post(
+                url + 'batch/',
+                [{'first_name': "Jane"}],
+                content_type='application/json',
+            )
+
+            expect(response.status_code) == 400
+            expect(lookups) == []
+
+        def with_a_non_list_body(expect, client, url, db, lookups):
+            response = client.post(url + 'batch/', 42, content_type='application/json')
+
+            expect(response.status_code) == 400
+            expect(lookups) == []
+
+        def with_a_failing_voter(
+            expect, client, url, db, lookups, monkeypatch, settings
+        ):
+            settings.DEBUG = True
+            cache_status = models.Voter.cache_registration_status
+
+            def cache_registration_status(voter, data, status):
+                if voter.first_name == "Broken":
+                    raise ValueError("Unexpected precinct")
+                return cache_status(voter, data, status)
+
+            monkeypatch.setattr(
+                models.Voter, 'cache_registration_status', cache_registration_status
+            )
+            voter = {
+                'first_name': "Jane",
+                'last_name': "Doe",
+                'birth_date': '2000-01-01',
+                'zip_code': '99999',
+            }
+
+            response = client.post(
+                url + 'batch/',
+                [dict(voter, first_name="Broken"), voter],
+                content_type='application/json',
+            )
+
+            expect(response.status_code) == 200
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            rows = sorted(
+                (json.loads(line) for line in lines), key=lambda r: r['index']
+            )
+            expect(rows[0]) == {
+                'index': 0,
+                'error': "Unable to determine registration status.",
+            }
+            expect(rows[1]['registered']) == False
+
 
 def describe_precincts():
     @pytest.fixture
@@ -154,6 +286,66 @@ def describe_precincts():
                 'number': '3',
             }
 
+    def describe_locate():
+        @pytest.fixture
+        def precinct(db, tmp_path, settings):
+            precinct = factories.PrecinctFactory.create(ward='1', number='2')
+            precinct.county.name = "Kent"
+            precinct.county.save()
+            precinct.jurisdiction.name = "City of Grand Rapids"
+            precinct.jurisdiction.save()
+
+            feature = {
+                'type': 'Feature',
+                'properties': {
+                    'county': "Kent",
+                    'jurisdiction': "City of Grand Rapids",
+                    'ward': '1',
+                    'number': '2',
+                },
+                'geometry': {
+                    'type': 'Polygon',
+                    'coordinates': [
+                        [[-85.7, 42.9], [-85.6, 42.9], [-85.6, 43.0], [-85.7, 42.9]]
+                    ],
+                },
+            }
+            path = tmp_path / 'kent.geojson'
+            path.write_text(
+                json.dumps({'type': 'FeatureCollection', 'features': [feature]})
+            )
+            settings.PRECINCT_BOUNDARIES_DIR = str(tmp_path)
+
+            boundaries.clear_cache()
+            yield precinct
+            boundaries.clear_cache()
+
+        def with_point_inside(expect, client, url, precinct):
+            response = client.get(url + 'locate/?latitude=42.92&longitude=-85.61')
+
+            expect(response.status_code) == 200
+            expect(response.data['id']) == precinct.id
+            expect(response.data['jurisdiction']) == "City of Grand Rapids"
+
+        def with_precinct_changes(expect, client, url, precinct):
+            client.get(url + 'locate/?latitude=42.92&longitude=-85.61')
+            precinct.number = '3'
+            precinct.save()
+
+            response = client.get(url + 'locate/?latitude=42.92&longitude=-85.61')
+
+            expect(response.status_code) == 404
+
+        def with_point_outside(expect, client, url, precinct):
+            response = client.get(url + 'locate/?latitude=42.98&longitude=-85.69')
+
+            expect(response.status_code) == 404
+
+        def with_invalid_coordinates(expect, client, url, precinct):
+            response = client.get(url + 'locate/?latitude=142.9&longitude=abc')
+
+            expect(response.status_code) == 400
+
 
 def describe_elections():
     @pytest.fixture
@@ -180,6 +372,109 @@ def describe_elections():
             expect(response.status_code) == 200
             expect(response.data['count']) == 2
 
+    def describe_export():
+        @pytest.fixture
+        def ballot(db):
+            ballot = factories.BallotFactory.create()
+            position = factories.PositionFactory.create(election=ballot.election)
+            position.precincts.add(ballot.precinct)
+            factories.CandidateFactory.create(position=position)
+            return ballot
+
+        def as_ndjson(expect, client, url, ballot):
+            response = client.get(f'{url}{ballot.election.id}/export/')
+
+            expect(response.status_code) == 200
+            expect(response['Content-Type']) == 'application/x-ndjson; charset=utf-8'
+            expect(response['Cache-Control']) == 'public, max-age=3600'
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            rows = [json.loads(line) for line in lines]
+            expect([row['type'] for row in rows]) == [
+                'precinct',
+                'position',
+                'candidate',
+                'position_precinct',
+            ]
+            expect(rows[3]) == {
+                'type': 'position_precinct',
+                'position_id': ballot.election.position_set.get().id,
+                'precinct_id': ballot.precinct.id,
+            }
+
+        def as_csv(expect, client, url, ballot):
+            response = client.get(f'{url}{ballot.election.id}/export/?format=csv')
+
+            expect(response.status_code) == 200
+            expect(response['Content-Disposition']) == (
+                f'attachment; filename="election-{ballot.election.id}.csv"'
+            )
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            expect(len(lines)) == 5
+            expect(lines[0]).startswith('type,id,name,')
+
+        def when_a_ballot_is_added(expect, client, url, ballot):
+            precinct = factories.PrecinctFactory.create(
+                county=ballot.precinct.county, jurisdiction=ballot.precinct.jurisdiction
+            )
+            response = client.get(f'{url}{ballot.election.id}/export/')
+            factories.BallotFactory.create(election=ballot.election, precinct=precinct)
+
+            response = client.get(
+                f'{url}{ballot.election.id}/export/',
+                HTTP_IF_NONE_MATCH=response['ETag'],
+            )
+
+            expect(response.status_code) == 200
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            expect(lines[1]).contains(f'"id": {precinct.id}')
+
+    def describe_vip():
+        @pytest.fixture
+        def ballot(db):
+            ballot = factories.BallotFactory.create()
+            position = factories.PositionFactory.create(election=ballot.election)
+            position.precincts.add(ballot.precinct)
+            factories.CandidateFactory.create(position=position, name="Jane Doe")
+            proposal = factories.ProposalFactory.create(election=ballot.election)
+            proposal.precincts.add(ballot.precinct)
+            return ballot
+
+        def it_streams_xml(expect, client, url, ballot):
+            response = client.get(f'{url}{ballot.election.id}/vip/')
+
+            expect(response.status_code) == 200
+            expect(response['Content-Type']) == 'application/xml; charset=utf-8'
+            expect(response['Cache-Control']) == 'public, max-age=3600'
+            content = b''.join(response.streaming_content).decode()
+            expect(content).contains('<VipObject ')
+            expect(content).contains('<Text language="en">Jane Doe</Text>')
+            expect(content).contains(
+                '<BallotSubTitle><Text language="en">4 Year Term</Text></BallotSubTitle>'
+            )
+            expect(ElementTree.fromstring(content).tag) == 'VipObject'
+
+        def it_dates_the_feed_by_its_data(expect, client, url, ballot):
+            candidate = models.Candidate.objects.get()
+            candidate.save()
+
+            response = client.get(f'{url}{ballot.election.id}/vip/')
+
+            content = b''.join(response.streaming_content).decode()
+            modified = candidate.modified.isoformat(timespec='seconds')
+            expect(content).contains(f'<DateTime>{modified}</DateTime>')
+
+        def it_orders_contests_on_each_ballot(expect, client, url, ballot):
+            position = ballot.election.position_set.get()
+            proposal = ballot.election.proposal_set.get()
+
+            response = client.get(f'{url}{ballot.election.id}/vip/')
+
+            content = b''.join(response.streaming_content).decode()
+            expect(content).contains(
+                f'<BallotStyle id="bs{ballot.precinct.id}"><OrderedContestIds>'
+                f'occ{position.id} obmc{proposal.id}</OrderedContestIds></BallotStyle>'
+            )
+
 
 def describe_ballots():
     @pytest.fixture
@@ -200,8 +495,8 @@ def describe_ballots():
             expect(response.status_code) == 200
             expect(response.data['results']) == [
                 {
-                    'url': 'http://testserver/api/ballots/1/',
-                    'id': 1,
+                    'url': f'http://testserver/api/ballots/{ballot.id}/',
+                    'id': ballot.id,
                     'election': {
                         'url': anything,
                         'id': anything,
@@ -215,7 +510,7 @@ def describe_ballots():
                         'id': anything,
                         'county': '',
                         'jurisdiction': '',
-                        'ward': '2',
+                        'ward': ballot.precinct.ward,
                         'number': '1A',
                     },
                     'mi_sos_url': 'https://mvic.sos.state.mi.us/Voter/GetMvicBallot/1111/2222/',
@@ -232,3 +527,368 @@ def describe_ballots():
 
             expect(response.status_code) == 200
             expect(response.data['count']) == 1
+
+
+def describe_etags():
+    @pytest.fixture
+    def url():
+        return '/api/elections/'
+
+    @pytest.fixture
+    def election(db):
+        return factories.ElectionFactory.create()
+
+    def it_is_included_on_responses(expect, client, url, election):
+        response = client.get(url)
+
+        expect(response.status_code) == 200
+        expect(response['ETag']).startswith('"')
+
+    def with_current_etag(expect, client, url, election):
+        etag = client.get(url)['ETag']
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        expect(response.status_code) == 304
+        expect(response.content) == b''
+
+    def with_stale_etag(expect, client, url, election):
+        etag = client.get(url)['ETag']
+        election.name = "State General"
+        election.save()
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        expect(response.status_code) == 200
+        expect(response['ETag']) != etag
+        expect(response.data['results'][0]['name']) == "State General"
+
+
+def describe_search():
+    @pytest.fixture
+    def url():
+        return '/api/search/'
+
+    @pytest.fixture
+    def items(db):
+        election = factories.ElectionFactory.create()
+        proposal = factories.ProposalFactory.create(
+            election=election,
+            name="School Millage Renewal",
+            description="Shall the schools continue to levy 1 mill?",
+        )
+        candidate = factories.CandidateFactory.create(
+            position__election=election, name="Gretchen Whitmer"
+        )
+        factories.PositionFactory.create(election=election, name="Drain Commissioner")
+        return proposal, candidate
+
+    def it_ranks_full_text_matches(expect, client, url, items):
+        proposal, _candidate = items
+
+        response = client.get(url + '?q=millage')
+
+        expect(response.status_code) == 200
+        expect(response.data[0]['type']) == 'proposal'
+        expect(response.data[0]['id']) == proposal.id
+        expect(response.data[0]['url']).endswith(f'/api/proposals/{proposal.id}/')
+
+    def it_matches_misspelled_names(expect, client, url, items):
+        _proposal, candidate = items
+
+        response = client.get(url + '?q=Gretchen Whitmar')
+
+        expect(response.status_code) == 200
+        expect([row['id'] for row in response.data]) == [candidate.id]
+
+    def it_normalizes_ranks(expect, client, url, items):
+        response = client.get(url + '?q=millage')
+
+        expect(0 < response.data[0]['rank'] < 1) == True
+
+    def it_skips_candidates_without_a_position(expect, client, url, items):
+        _proposal, candidate = items
+        factories.CandidateFactory.create(position=None, name="Gretchen Whitmer")
+
+        response = client.get(url + '?q=Whitmer')
+
+        expect([row['id'] for row in response.data]) == [candidate.id]
+
+    def it_filters_by_election(expect, client, url, items):
+        response = client.get(url + '?q=millage&election_id=999')
+
+        expect(response.status_code) == 200
+        expect(response.data) == []
+
+    def it_requires_a_query(expect, client, url, db):
+        response = client.get(url + '?q=a')
+
+        expect(response.status_code) == 400
+
+
+def describe_metrics():
+    @pytest.fixture
+    def election(db):
+        metrics.registry.flush()
+        cache.clear()
+        return factories.ElectionFactory.create()
+
+    def it_adds_server_timing_headers(expect, client, election):
+        miss = client.get('/api/elections/')
+        hit = client.get('/api/elections/')
+
+        expect(miss['Server-Timing']).contains('queries"')
+        expect(miss['Server-Timing']).contains('cache;desc=miss')
+        expect(hit['Server-Timing']).contains('cache;desc=hit')
+
+    def it_exports_counters_per_view(expect, client, admin_client, election):
+        client.get('/api/elections/')
+        client.get('/api/elections/')
+
+        response = admin_client.get('/metrics')
+
+        expect(response.status_code) == 200
+        expect(response['Content-Type']).startswith('text/plain')
+        text = response.content.decode()
+        expect(text).contains('elections_requests_total{view="election-list"} 2\n')
+        expect(text).contains('elections_cache_hits_total{view="election-list"} 1\n')
+        expect(text).contains('elections_cache_misses_total{view="election-list"} 1\n')
+        expect(text).contains('elections_db_seconds_total{view="election-list"} ')
+        expect(text).contains('elections_python_seconds_total{view="election-list"} ')
+
+    def it_times_serializers_separately(expect, client, admin_client, election):
+        factories.PrecinctFactory.create()
+
+        response = client.get('/api/precincts/')
+
+        expect(response['Server-Timing']).contains('serializer;dur=')
+        text = admin_client.get('/metrics').content.decode()
+        expect(text).contains(
+            'elections_serializer_seconds_total{view="precinct-list"} '
+        )
+
+    def it_requires_authorization(expect, client, election):
+        response = client.get('/metrics')
+
+        expect(response.status_code) == 403
+
+    def it_accepts_the_metrics_token(expect, client, election, settings):
+        settings.METRICS_TOKEN = 'secret'
+
+        rejected = client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+        accepted = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+
+        expect(rejected.status_code) == 403
+        expect(accepted.status_code) == 200
+
+    def with_crawler_progress(expect, client, admin_client, election):
+        models.BallotWebsite.objects.create(
+            mi_sos_election_id=election.mi_sos_id,
+            mi_sos_precinct_id=1,
+            refetch_weight=0.25,
+        )
+        stats = metrics.CrawlerStats(election.mi_sos_id)
+        stats.record_fetch(valid=True)
+        stats.record_visit(1, valid=True)
+
+        text = admin_client.get('/metrics').content.decode()
+
+        expect(text).contains('elections_crawler_fetches_total{election="2222"} 1\n')
+        expect(text).contains(
+            'elections_crawler_refetch_weight_bucket{election="2222",le="0.1"} 0\n'
+        )
+        expect(text).contains(
+            'elections_crawler_refetch_weight_bucket{election="2222",le="0.25"} 1\n'
+        )
+
+        response = admin_client.get('/admin/elections/ballotwebsite/crawler/')
+
+        expect(response.status_code) == 200
+        expect(response.content.decode()).contains("1 (100%)")
+
+
+def describe_positions():
+    @pytest.fixture
+    def url():
+        return '/api/positions/'
+
+    @pytest.fixture
+    def position(db):
+        position = factories.PositionFactory.create()
+        factories.CandidateFactory.create(position=position)
+        return position
+
+    def describe_list():
+        def with_fields(expect, client, url, position, django_assert_num_queries):
+            with django_assert_num_queries(2):
+                response = client.get(url + '?fields=id,name')
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == [
+                {'id': position.id, 'name': position.name}
+            ]
+
+        def with_nothing_expanded(expect, client, url, position, anything):
+            response = client.get(url + '?fields=id,candidates,election&expand=')
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == [
+                {
+                    'id': position.id,
+                    'candidates': [
+                        f'http://testserver/api/candidates/{position.candidates.get().id}/'
+                    ],
+                    'election': f'http://testserver/api/elections/{position.election.id}/',
+                }
+            ]
+
+        def with_candidates_expanded(expect, client, url, position, anything):
+            response = client.get(url + '?fields=candidates,district&expand=candidates')
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == [
+                {
+                    'candidates': [
+                        {
+                            'url': anything,
+                            'id': anything,
+                            'name': position.candidates.get().name,
+                            'description': '',
+                            'reference_url': None,
+                            'party': anything,
+                        }
+                    ],
+                    'district': f'http://testserver/api/districts/{position.district.id}/',
+                }
+            ]
+
+        def filter_by_ward_shared_by_precincts(expect, client, url, position):
+            precinct = factories.PrecinctFactory.create(ward='9', number='1')
+            position.precincts.add(
+                precinct,
+                factories.PrecinctFactory.create(
+                    county=precinct.county,
+                    jurisdiction=precinct.jurisdiction,
+                    ward='9',
+                    number='2',
+                ),
+            )
+
+            response = client.get(url + '?precinct_ward=9&fields=id')
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == [{'id': position.id}]
+
+
+def describe_candidates():
+    @pytest.fixture
+    def url():
+        return '/api/candidates/'
+
+    @pytest.fixture
+    def precinct(db):
+        return factories.PrecinctFactory.create()
+
+    @pytest.fixture
+    def candidate(precinct):
+        position = factories.PositionFactory.create()
+        position.precincts.add(precinct)
+        return factories.CandidateFactory.create(position=position)
+
+    @pytest.fixture
+    def other(precinct):
+        election = factories.ElectionFactory.create(name="Primary", mi_sos_id=3333)
+        position = factories.PositionFactory.create(election=election)
+        position.precincts.add(
+            factories.PrecinctFactory.create(
+                county=precinct.county, jurisdiction=precinct.jurisdiction
+            )
+        )
+        return factories.CandidateFactory.create(position=position)
+
+    def describe_list():
+        def filter_by_precinct(
+            expect, client, url, precinct, candidate, other, django_assert_num_queries
+        ):
+            with django_assert_num_queries(2):
+                response = client.get(url + f'?precinct_id={precinct.id}&fields=id')
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == [{'id': candidate.id}]
+
+        def filter_by_ward_shared_by_precincts(
+            expect, client, url, precinct, candidate
+        ):
+            candidate.position.precincts.add(
+                *(
+                    factories.PrecinctFactory.create(
+                        county=precinct.county,
+                        jurisdiction=precinct.jurisdiction,
+                        ward='9',
+                        number=number,
+                    )
+                    for number in ['1', '2']
+                )
+            )
+
+            response = client.get(url + '?precinct_ward=9&fields=id')
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == [{'id': candidate.id}]
+
+        def filter_by_several_precinct_fields(expect, client, url, precinct, candidate):
+            candidate.position.precincts.add(
+                *(
+                    factories.PrecinctFactory.create(
+                        county=precinct.county,
+                        jurisdiction=precinct.jurisdiction,
+                        ward=ward,
+                        number=number,
+                    )
+                    for ward, number in [('9', '1'), ('8', '2')]
+                )
+            )
+            queryset = filters.CandidateFilter(
+                {'precinct_ward': '9', 'precinct_number': '1'},
+                queryset=models.Candidate.objects.all(),
+            ).qs
+
+            matched = client.get(url + '?precinct_ward=9&precinct_number=1&fields=id')
+            mixed = client.get(url + '?precinct_ward=9&precinct_number=2&fields=id')
+
+            expect(str(queryset.query).count('elections_position_precincts')) == 1
+            expect(matched.data['results']) == [{'id': candidate.id}]
+            expect(mixed.data['results']) == []
+
+        def filter_by_election(expect, client, url, candidate, other):
+            response = client.get(
+                url + f'?election_id={other.position.election.id}&fields=id'
+            )
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == [{'id': other.id}]
+
+        def filter_by_party(expect, client, url, candidate, other):
+            response = client.get(url + f'?party={candidate.party.name}&fields=id')
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == [{'id': candidate.id}]
+
+        def filter_by_position_and_district(expect, client, url, candidate, other):
+            position = other.position
+            response = client.get(
+                url
+                + f'?position_id={position.id}&district_id={position.district.id}'
+                + '&fields=id'
+            )
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == [{'id': other.id}]
+
+        def filter_active_elections_by_default(expect, client, url, candidate):
+            models.Election.objects.update(active=False)
+
+            response = client.get(url + '?fields=id')
+
+            expect(response.status_code) == 200
+            expect(response.data['results']) == []
@@ -0,0 +1,103 @@
+# pylint: disable=unused-argument,unused-variable
+
+from django.core.management import call_command
+
+import pytest
+
+from elections import models
+
+from . import factories
+
+
+def describe_clean_data():
+    @pytest.fixture
+    def county(db):
+        return factories.CountyFactory(name="Kent")
+
+    @pytest.fixture
+    def jurisdiction(db):
+        return factories.JurisdictionFactory(name="City of Grand Rapids")
+
+    @pytest.fixture
+    def election(db):
+        return factories.ElectionFactory()
+
+    @pytest.fixture
+    def ballot(election, county, jurisdiction):
+        precinct = factories.PrecinctFactory(
+            county=county, jurisdiction=jurisdiction, mi_sos_id=1
+        )
+        return factories.BallotFactory(election=election, precinct=precinct)
+
+    def _website(ballot, mi_sos_precinct_id, **kwargs):
+        return models.BallotWebsite.objects.create(
+            ballot=ballot,
+            mi_sos_election_id=ballot.election.mi_sos_id,
+            mi_sos_precinct_id=mi_sos_precinct_id,
+            **kwargs,
+        )
+
+    def it_deletes_the_less_specific_duplicate_precinct(
+        expect, county, jurisdiction, election
+    ):
+        specific = factories.PrecinctFactory(
+            county=county, jurisdiction=jurisdiction, ward='1', number='2'
+        )
+        vague = factories.PrecinctFactory(
+            county=county, jurisdiction=jurisdiction, ward='', number='2'
+        )
+
+        call_command('clean_data')
+
+        expect(list(models.Precinct.objects.all())) == [specific]
+
+    def it_selects_the_newest_website_as_the_source(expect, ballot):
+        old = _website(ballot, 1, source=True, table_count=3)
+        new = _website(ballot, 5, table_count=4)
+
+        call_command('clean_data')
+
+        old.refresh_from_db()
+        new.refresh_from_db()
+        ballot.precinct.refresh_from_db()
+        expect(old.source) == False
+        expect(new.source) == True
+        expect(ballot.precinct.mi_sos_id) == 5
+
+    def it_keeps_existing_sources_without_tables(expect, ballot):
+        old = _website(ballot, 1, source=True, table_count=3)
+        new = _website(ballot, 5, table_count=0)
+
+        call_command('clean_data')
+
+        old.refresh_from_db()
+        new.refresh_from_db()
+        expect(old.source) == True
+        expect(new.source) == None
+
+    def it_uses_a_constant_number_of_queries(
+        expect, django_assert_max_num_queries, election, county, jurisdiction
+    ):
+        for index in range(20):
+            precinct = factories.PrecinctFactory(
+                county=county, jurisdiction=jurisdiction, mi_sos_id=index + 100
+            )
+            ballot = factories.BallotFactory(election=election, precinct=precinct)
+            _website(ballot, index + 1, source=True, table_count=3)
+            _website(ballot, index + 200, table_count=3)
+
+        with django_assert_max_num_queries(15):
+            call_command('clean_data')
+
+        expect(models.BallotWebsite.objects.filter(source=True).count()) == 20
+
+    def describe_dry_run():
+        def it_saves_nothing(expect, ballot):
+            website = _website(ballot, 5, table_count=3)
+
+            call_command('clean_data', dry_run=True)
+
+            website.refresh_from_db()
+            ballot.precinct.refresh_from_db()
+            expect(website.source) == None
+            expect(ballot.precinct.mi_sos_id) == 1
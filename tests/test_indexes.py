@@ -0,0 +1,102 @@
+# pylint: disable=unused-argument,unused-variable,redefined-outer-name
+
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.db.models import Q
+
+import pytest
+
+from elections import filters, models
+
+
+HOT_QUERIES = {
+    'precinct_by_mi_sos_id': (
+        lambda: models.Precinct.objects.filter(mi_sos_id=1234),
+        ['elections_precinct'],
+    ),
+    'election_by_mi_sos_id': (
+        lambda: models.Election.objects.filter(mi_sos_id=676),
+        ['elections_election'],
+    ),
+    'source_website': (
+        lambda: models.BallotWebsite.objects.filter(ballot=1, source=True),
+        ['elections_ballotwebsite'],
+    ),
+    'websites_by_ballot': (
+        lambda: models.BallotWebsite.objects.filter(ballot=1).order_by(
+            'mi_sos_precinct_id'
+        ),
+        ['elections_ballotwebsite'],
+    ),
+    'precincts_by_name': (
+        lambda: filters.PrecinctFilter(
+            {'county': "Kent", 'jurisdiction': "Grand Rapids", 'ward': '1'},
+            queryset=models.Precinct.objects.all(),
+        ).qs,
+        ['elections_district', 'elections_precinct'],
+    ),
+    'ballots_by_precinct': (
+        lambda: filters.BallotFilter(
+            {'precinct_jurisdiction': "Grand Rapids", 'precinct_ward': '1'},
+            queryset=models.Ballot.objects.all(),
+        ).qs,
+        ['elections_district', 'elections_election', 'elections_precinct'],
+    ),
+    'proposals_by_precinct': (
+        lambda: filters.ProposalFilter(
+            {'precinct_county': "Kent", 'precinct_number': '1'},
+            queryset=models.Proposal.objects.all(),
+        ).qs,
+        ['elections_district', 'elections_election', 'elections_precinct'],
+    ),
+    'positions_by_precinct': (
+        lambda: filters.PositionFilter(
+            {'precinct_id': 1}, queryset=models.Position.objects.all()
+        ).qs,
+        ['elections_election', 'elections_position_precincts'],
+    ),
+    'candidates_by_precinct': (
+        lambda: filters.CandidateFilter(
+            {'precinct_id': 1}, queryset=models.Candidate.objects.all()
+        ).qs,
+        ['elections_candidate', 'elections_election', 'elections_position_precincts'],
+    ),
+    'candidates_by_election': (
+        lambda: filters.CandidateFilter(
+            {'election_id': 1, 'party_id': 1}, queryset=models.Candidate.objects.all()
+        ).qs,
+        ['elections_candidate', 'elections_election', 'elections_position'],
+    ),
+    'proposals_by_search': (
+        lambda: models.Proposal.objects.filter(
+            Q(search_vector=SearchQuery('millage', config='english'))
+            | Q(name__trigram_similar='millage')
+        ),
+        ['elections_proposal'],
+    ),
+}
+
+
+def describe_hot_filters():
+    @pytest.fixture
+    def seqscan_disabled(db):
+        if connection.vendor != 'postgresql':
+            pytest.skip("Query plans are only checked against PostgreSQL")
+
+        # An empty table is always cheapest to scan sequentially, so make the
+        # planner fall back to one only when no index can serve the filter. This
+        # shows that an index is usable, not that production row counts pick it.
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+        yield
+        with connection.cursor() as cursor:
+            cursor.execute("RESET enable_seqscan")
+
+    @pytest.mark.parametrize('name', HOT_QUERIES.keys())
+    def it_can_use_indexes(expect, seqscan_disabled, name):
+        build, tables = HOT_QUERIES[name]
+
+        plan = build().explain()
+
+        for table in tables:
+            expect(plan).excludes(f"Seq Scan on {table} ")
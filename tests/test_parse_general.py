@@ -4,8 +4,10 @@ from types import SimpleNamespace
 
 import pendulum
 import pytest
+from bs4 import BeautifulSoup
 
 from elections import models
+from elections.legacy_parsers import general
 
 
 @pytest.fixture
@@ -416,3 +418,35 @@ def describe_ballot_website():
             website.fetch()
 
             expect(len(website.parse())) == 30
+
+
+def describe_route():
+    def _route(html, party=None):
+        table = BeautifulSoup(html, 'html.parser').table
+        handler, _markers = general.route(table, party=party)
+        return handler
+
+    def it_matches_section_headers(expect):
+        html = '<table class="mainTable"><tr><td class="section">PARTISAN SECTION'
+        expect(_route(html)) == general.handle_main_wrapper
+
+    def it_matches_continued_sections(expect):
+        html = '<table class="generalTable"><tr><td class="continuation">Continued'
+        expect(_route(html)) == general.handle_general_wrapper
+
+    def it_matches_partisan_offices(expect):
+        html = '<table class="tblOffice"><tr><td class="office">Governor'
+        expect(_route(html)) == general.handle_partisan_section
+
+    def it_matches_nonpartisan_offices_after_the_nonpartisan_header(expect):
+        html = '<table class="tblOffice"><tr><td class="office">Judge'
+        party = models.Party(name="Nonpartisan")
+        expect(_route(html, party)) == general.handle_nonpartisan_section
+
+    def it_matches_proposals(expect):
+        html = '<table class="proposal"><tr><td class="proposalTitle">Millage'
+        expect(_route(html)) == general.handle_proposals
+
+    def it_skips_unknown_tables(expect):
+        html = '<table class="other"><tr><td class="section">Instructions'
+        expect(_route(html)) == None
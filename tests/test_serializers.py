@@ -0,0 +1,78 @@
+# pylint: disable=unused-argument,unused-variable
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from elections import models, serializers
+
+from . import factories
+
+
+@pytest.fixture
+def request_():
+    return APIRequestFactory().get('/api/')
+
+
+@pytest.fixture
+def data(db):
+    election = factories.ElectionFactory.create()
+    precinct = factories.PrecinctFactory.create()
+    for _ in range(3):
+        position = factories.PositionFactory.create(election=election)
+        position.precincts.add(precinct)
+        factories.CandidateFactory.create(position=position)
+        factories.CandidateFactory.create(position=position, party=None)
+    factories.PositionFactory.create(election=election, district=None)
+    factories.ProposalFactory.create(election=election).precincts.add(precinct)
+    factories.BallotFactory.create(election=election, precinct=precinct)
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def describe_values_serializers():
+    @pytest.mark.parametrize(
+        'model, serializer_class, values_serializer_class',
+        [
+            (
+                models.Precinct,
+                serializers.PrecinctSerializer,
+                serializers.PrecinctValuesSerializer,
+            ),
+            (
+                models.Ballot,
+                serializers.BallotSerializer,
+                serializers.BallotValuesSerializer,
+            ),
+            (
+                models.Proposal,
+                serializers.ProposalSerializer,
+                serializers.ProposalValuesSerializer,
+            ),
+            (
+                models.Candidate,
+                serializers.CandidateSerializer,
+                serializers.CandidateValuesSerializer,
+            ),
+            (
+                models.Position,
+                serializers.PositionSerializer,
+                serializers.PositionValuesSerializer,
+            ),
+        ],
+    )
+    def it_matches_the_hyperlinked_serializers(
+        expect, request_, data, model, serializer_class, values_serializer_class
+    ):
+        queryset = model.objects.all()
+        expected = serializer_class(
+            queryset, many=True, context={'request': request_}
+        ).data
+
+        values_serializer = values_serializer_class(request_)
+        rows = list(values_serializer.get_queryset(queryset))
+        actual = values_serializer.to_representation(rows)
+
+        expect(render(actual)) == render(expected)